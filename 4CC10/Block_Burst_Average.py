@@ -0,0 +1,69 @@
+#==============================================================================
+# Step response of the filter with a burst capture.
+# The block generator (OUT1) drives the filter, every rising edge on IN2
+# triggers a capture. K captures are made in bursts of 10 and averaged on
+# the host, only one burst is in memory.
+#
+# M. Hajer, 2021
+#==============================================================================
+
+import sys
+sys.path.append('../classes')
+
+import redpitaya_scpi as scpi
+import matplotlib.pyplot as plt
+import numpy as np
+from redpitaya_class import redpitaya_scope as redpitaya_scope
+from redpitaya_class import redpitaya_generator as redpitaya_generator
+from ensemble_class import ensemble_average as ensemble_average
+
+import addcopyfighandler
+
+def main():
+    ip = "192.168.3.150"
+    K  = 50
+
+    Pitaya = scpi.scpi(ip)
+
+    Generator = redpitaya_generator(Pitaya)
+    Generator.Square(Channel = 1, Amplitude = 0.5, Frequency = 10)
+    Generator.EnableOutput(Channel = 1)
+
+    # Trigger at 1/8 of the buffer, decimation 1024: 134 msec per capture
+    Scope = redpitaya_scope(Pitaya)
+    Scope.SetDecimationBeta(10)
+    Scope.SetInputGain(Channel = 1, Gain = 'LV')
+    Scope.SetInputGain(Channel = 2, Gain = 'LV')
+    Scope.SetTrigger(Trigger = "CH2_PE", Level = 0.0, Delay = 6144)
+
+    Average = ensemble_average()
+
+    for i in range(K // 10):
+        Data, Timestamps = Scope.CaptureBurst(10, Timeout = 5)
+        Average.Add(Data, Batch = True)
+
+    Pitaya.close()
+
+    Interval = np.diff(Timestamps)
+    print("Captures        : %d" % Average.NrCaptures)
+    print("Trigger interval: %.1f msec (min %.1f, max %.1f)" % (1000 * np.mean(Interval), 1000 * np.min(Interval), 1000 * np.max(Interval)))
+    print("Noise on mean   : %.3f mV" % (1000 * np.mean(Average.StdError[0])))
+
+    x    = Scope.GetTimeVector() * 1000
+    Mean = Average.Mean
+    Std  = Average.Std
+
+    fig, axes = plt.subplots(1, 1)
+    axes.plot(x, Mean[1], 'b-', label = 'Input (IN2)')
+    axes.plot(x, Mean[0], 'g-', label = 'Output (IN1), mean of %d' % K)
+    axes.fill_between(x, Mean[0] - Std[0], Mean[0] + Std[0], color = 'g', alpha = 0.3, label = '+/- 1 std')
+    axes.plot(x, Average.Min[0], 'g:', linewidth = 0.5, label = 'min/max')
+    axes.plot(x, Average.Max[0], 'g:', linewidth = 0.5)
+    axes.grid(True)
+    axes.legend()
+    axes.set(xlabel = 'Time [msec]', ylabel = 'Volt [Volt]', title = 'Step response, burst average')
+    plt.show()
+
+
+if __name__== "__main__":
+    main()
@@ -19,7 +19,7 @@ import numpy as np
 from redpitaya_class import redpitaya_scope as redpitaya_scope
 import addcopyfighandler
 import mplcursors
-from scipy.fft import fft, ifft
+from frf_class import frf_accumulator as frf_accumulator
 from matplotlib.ticker import MultipleLocator, AutoMinorLocator
 
 cls = lambda: print("\033[2J\033[;H", end="")
@@ -107,65 +107,49 @@ def main():
     Scope.SetTrigger(Trigger="NOW")
 
     N = 3
-    Data1 = np.zeros((N, Scope.NrSamples))
-    Data2 = np.zeros((N, Scope.NrSamples))
+    # Spectra are averaged per capture, the captures are not kept.
+    Accumulator = frf_accumulator(SampleFrequency=Scope.Frequency, SegmentLength=Scope.NrSamples // 4, Overlap=0.5, Window="hann")
 
     for i in range(N):
         print("------------------------------------------")
         print("Run             : %d of %d" % (i + 1, N))
 
         Scope.Start()
-        time.sleep(1)
+        Scope.WaitForPreTrigger(Delay = 8192)
 
         Scope.SetTrigger(Trigger="NOW", Delay=8192)
         Scope.PrintSettings()
         Scope.WaitForTrigger()
 
-        time.sleep(1)
+        Data1, Data2 = Scope.GetDataBoth()
 
-        Data1[i] = Scope.GetGain(1) * Scope.GetData_Txt(Channel=1)
-        Data2[i] = Scope.GetGain(2) * Scope.GetData_Txt(Channel=2)
+        Accumulator.Add(Input=Data2, Output=Data1)
+        print("Coherence       : %.3f" % Accumulator.GetMeanCoherence())
+        print("Random error    : %.4f" % Accumulator.GetConvergence())
 
+        # Stop early when the estimate is good enough
+        if Accumulator.IsConverged(Coherence=0.9, Error=0.02):
+            print("Converged after %d runs" % (i + 1))
+            break
     Pitaya.close()
 
-    db_mag = np.zeros((N, Scope.NrSamples // 2))
-    phase = np.zeros((N, Scope.NrSamples // 2))
-    freq = np.zeros((1, Scope.NrSamples // 2))
+    # Welch estimate over all runs: 4 hann windowed segments per capture
+    # with 50% overlap, spectra averaged in the complex domain.
+    Result = Accumulator.Result
 
-    for i in range(N):
-        x = np.arange(0, Scope.NrSamples)
-
-        # Add hamming filter window to smooth begin and end of the data.
-        Data1[i] = Data1[i] * np.hamming(Scope.NrSamples)
-        Data2[i] = Data2[i] * np.hamming(Scope.NrSamples)
-
-        G = fft(Data1[i]) / fft(Data2[i])
-        length = len(G)
-        middle_index = length // 2
-
-        freq = x[:middle_index] / Scope.NrSamples * Scope.Frequency
-        H = G[:middle_index]
-
-        db_mag[i] = 20 * np.log10(np.abs(H))
-        phase[i] = np.arctan2(np.imag(H), np.real(H)) * 180 / np.pi
-
-    # Average the N plots
-    db_mag_avg = np.zeros((1, Scope.NrSamples // 2))
-    phase_avg = np.zeros((1, Scope.NrSamples // 2))
-
-    db_mag_avg = db_mag.sum(axis=0, keepdims=True) / N
-    phase_avg = phase.sum(axis=0, keepdims=True) / N
+    # Skip the DC bin on the log axis
+    freq = Result.Freq[1:]
 
     plt.style.use("default")
 
     fig = plt.figure()
     plt.minorticks_on()
-    ax11 = plt.subplot(211)
+    ax11 = plt.subplot(311)
     ax11.grid(which="both")
-    plt.semilogx(freq, db_mag[0], "g-")
-    plt.semilogx(freq, db_mag[1], "b-")
-    plt.semilogx(freq, db_mag[2], "r-")
-    ax11.set(ylabel="Gain [dB]", xlabel="Frequency [Hz]", title="Bode plot")
+    plt.semilogx(freq, Result.GetMagnitude_dB("H1")[1:], "b-", label="H1")
+    plt.semilogx(freq, Result.GetMagnitude_dB("H2")[1:], "r-", label="H2")
+    ax11.set(ylabel="Gain [dB]", xlabel="Frequency [Hz]", title="Bode plot (" + str(Result.NrAverages) + " averages)")
+    ax11.legend()
 
     # Fix the minor grid lines on the upper Y-axis
     # 1 dB on gain plot.
@@ -174,59 +158,31 @@ def main():
     ax11.grid(which="minor", alpha=0.3)
     ax11.grid(which="major", alpha=1.0)
 
-    ax12 = plt.subplot(212)
+    plt.ylim([-40, 20])
+    plt.xlim([100, 100000])
+
+    ax12 = plt.subplot(312)
     ax12.grid(which="both")
-    plt.semilogx(freq, phase[0], "g-")
-    plt.semilogx(freq, phase[1], "b-")
-    plt.semilogx(freq, phase[2], "r-")
+    plt.semilogx(freq, Result.GetPhase_deg("H1")[1:], "b-", label="H1")
+    plt.semilogx(freq, Result.GetPhase_deg("H2")[1:], "r-", label="H2")
     ax12.set(ylabel="Phase [deg]", xlabel="Frequency [Hz]")
 
-    # Fix the minor grid lines on the lower Y-axis
+    # Fix the minor grid lines on the middle Y-axis
     # 10 degree on phase plot
     ml = MultipleLocator(10)
     ax12.yaxis.set_minor_locator(ml)
     ax12.grid(which="minor", alpha=0.3)
     ax12.grid(which="major", alpha=1.0)
-
-    # Average plot
-    fig = plt.figure()
-    plt.minorticks_on()
-
-    ax21 = plt.subplot(211)
-    ax21.grid(which="both")
-    plt.semilogx(freq, db_mag_avg[0], "b-")
-    plt.minorticks_on()
-    ax21.grid(which="minor", alpha=0.3)
-    ax21.grid(which="major", alpha=1.0)
-
-    # Fix the minor grid lines on the upper Y-axis
-    # 1 dB on gain plot.
-    ml = MultipleLocator(1)
-    ax21.yaxis.set_minor_locator(ml)
-    ax21.grid(which="minor", alpha=0.3)
-    ax21.grid(which="major", alpha=1.0)
-    ax21.set(ylabel="Gain [dB]", xlabel="Frequency [Hz]", title="Bode plot")
-
-    plt.ylim([-40, 20])
     plt.xlim([100, 100000])
 
-    ax22 = plt.subplot(212)
-    ax22.grid(which="both")
-    plt.semilogx(freq, phase_avg[0], "b-")
-    plt.minorticks_on()
-
-    # Fix the minor grid lines on the lower Y-axis
-    # 10 degree on phase plot
-    ml = MultipleLocator(10)
-    ax22.yaxis.set_minor_locator(ml)
-    ax22.grid(which="minor", alpha=0.3)
-    ax22.grid(which="major", alpha=1.0)
-    ax22.set(ylabel="Phase [deg]", xlabel="Frequency [Hz]")
-
-    plt.xlim([1, 10000])
+    ax13 = plt.subplot(313)
+    ax13.grid(which="both")
+    plt.semilogx(freq, Result.Coherence[1:], "g-")
+    ax13.set(ylabel="Coherence [-]", xlabel="Frequency [Hz]")
+    ax13.set_ylim([0.0, 1.05])
     plt.xlim([100, 100000])
 
-    mplcursors.cursor([ax11, ax12, ax21, ax22], multiple=True)
+    mplcursors.cursor([ax11, ax12, ax13], multiple=True)
 
     plt.show()
 
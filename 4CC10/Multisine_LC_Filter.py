@@ -0,0 +1,114 @@
+# ==============================================================================
+# Multisine FRF of the LC filter.
+# The generator repeats one period of a multisine with its lines on the FFT
+# bins of the scope, two captures give the FRF without leakage or windowing.
+# Compare with FRF_multiple_LC_Filter.py (noise, many averages).
+#
+# M. Hajer, 2021
+# ==============================================================================
+
+import sys
+
+sys.path.append("../classes")
+
+import time
+import redpitaya_scpi as scpi
+import matplotlib.pyplot as plt
+import numpy as np
+from redpitaya_class import redpitaya_scope as redpitaya_scope
+from redpitaya_class import redpitaya_generator as redpitaya_generator
+from multisine_class import multisine as multisine
+import addcopyfighandler
+import mplcursors
+from matplotlib.ticker import MultipleLocator
+
+
+def main():
+    # -------------------------------------------------------
+    # Input 1   : yellow    : output of plant
+    # Input 2   : pink      : input of plant
+    # Output 1  : green     : multisine to the plant
+    # All probes 1x
+    # -------------------------------------------------------
+    ip = "192.168.3.150"
+
+    # create a scpi object.
+    Pitaya = scpi.scpi(ip)
+
+    Scope = redpitaya_scope(Pitaya)
+    Generator = redpitaya_generator(Pitaya)
+
+    # The design depends on the sample frequency, set the decimation first
+    Scope.SetDecimationBeta(10)
+    Scope.SetInputGain(Channel=1, Gain="HV")
+    Scope.SetInputGain(Channel=2, Gain="LV")
+    Scope.SetProbeGain(Probe=1, Gain=1)
+    Scope.SetProbeGain(Probe=2, Gain=1)
+    Scope.SetAverage(0)
+
+    # 200 log spaced lines, 2 periods per capture for the coherence
+    Design = multisine(SampleFrequency=Scope.Frequency, FrequencyMin=10, FrequencyMax=20000, NrLines=200,
+                       Spacing="log", Phase="optimized", Periods=2)
+    Design.PrintSettings()
+
+    Generator.Arbitrary(Channel=1, Samples=Design.Samples, Amplitude=0.5, Frequency=Design.GeneratorFrequency)
+    Generator.EnableOutput(Channel=1)
+
+    # Let the filter settle on the periodic signal
+    time.sleep(2 * Scope.Duration)
+
+    N = 2
+    Output = np.zeros((N, Scope.NrSamples))
+    Input = np.zeros((N, Scope.NrSamples))
+
+    for i in range(N):
+        Scope.SetTrigger(Trigger="NOW", Delay=8192)
+        Scope.Start()
+        Scope.WaitForTrigger(Timeout=5.0)
+        Output[i], Input[i] = Scope.GetDataBoth()
+
+    Pitaya.close()
+
+    Result = Design.Estimate(Input=Input, Output=Output)
+
+    plt.style.use("default")
+
+    fig = plt.figure()
+    plt.minorticks_on()
+    ax11 = plt.subplot(311)
+    ax11.grid(which="both")
+    plt.semilogx(Design.Freq, Design.GetMagnitude_dB(Result, "H1"), "b.-", label="H1")
+    ax11.set(ylabel="Gain [dB]", xlabel="Frequency [Hz]",
+             title="Multisine (%d lines, %d periods)" % (len(Design.Lines), Result.NrAverages))
+    ax11.legend()
+
+    # 1 dB on gain plot.
+    ml = MultipleLocator(1)
+    ax11.yaxis.set_minor_locator(ml)
+    ax11.grid(which="minor", alpha=0.3)
+    ax11.grid(which="major", alpha=1.0)
+
+    ax12 = plt.subplot(312)
+    ax12.grid(which="both")
+    plt.semilogx(Design.Freq, Design.GetPhase_deg(Result, "H1"), "b.-", label="H1")
+    ax12.set(ylabel="Phase [deg]", xlabel="Frequency [Hz]")
+
+    # 10 degree on phase plot
+    ml = MultipleLocator(10)
+    ax12.yaxis.set_minor_locator(ml)
+    ax12.grid(which="minor", alpha=0.3)
+    ax12.grid(which="major", alpha=1.0)
+
+    ax13 = plt.subplot(313)
+    ax13.grid(which="both")
+    plt.semilogx(Design.Freq, Result.Coherence[Design.Lines], "g.-")
+    ax13.set(ylabel="Coherence [-]", xlabel="Frequency [Hz]")
+    ax13.set_ylim([0.0, 1.05])
+
+    mplcursors.cursor([ax11, ax12, ax13], multiple=True)
+
+    plt.show()
+
+
+if __name__ == "__main__":
+    main()
@@ -18,6 +18,7 @@ import math
 import random
 from redpitaya_class import redpitaya_scope as redpitaya_scope
 from redpitaya_class import redpitaya_generator as redpitaya_generator
+from waveform_library import waveform_library as waveform_library
 
 import mplcursors
 
@@ -42,7 +43,9 @@ def main():
     #--------------------------------------------------------------------------------------------------------
     # For the ARBITRARY waveform, this is the frequency of one signal period (a buffer of 16384 samples).
     #--------------------------------------------------------------------------------------------------------
-    Generator.Noise(Channel = 1, Amplitude = 0.5, Frequency = 122070.0 / 16384.0)
+    # The same seeded noise buffer every run, generated once and stored on disk.
+    Library = waveform_library()
+    Generator.Arbitrary(Channel = 1, Samples = Library.Noise(Seed = 42), Amplitude = 0.5, Frequency = 122070.0 / 16384.0)
 
     # Generator.Noise(Channel = 1, Amplitude = 1, Frequency = 30518.0 / 16384.0)
     # Generator.Noise(Channel = 1, Amplitude = 1, Frequency = 61035.0 / 16384.0)
@@ -0,0 +1,89 @@
+# ==============================================================================
+# Stepped sine FRF of the LC filter.
+# The generator steps through log spaced frequencies, the scope decimation
+# follows the frequency and both channels are demodulated (lock-in).
+# Extra frequencies are measured around the resonance.
+#
+# M. Hajer, 2021
+# ==============================================================================
+
+import sys
+
+sys.path.append("../classes")
+
+import redpitaya_scpi as scpi
+import matplotlib.pyplot as plt
+import numpy as np
+from redpitaya_class import redpitaya_scope as redpitaya_scope
+from redpitaya_class import redpitaya_generator as redpitaya_generator
+from sweep_class import sine_sweep as sine_sweep
+import addcopyfighandler
+import mplcursors
+from matplotlib.ticker import MultipleLocator
+
+
+def main():
+    # -------------------------------------------------------
+    # Input 1   : yellow    : output of plant
+    # Input 2   : pink      : input of plant
+    # Output 1  : green     : sine to the plant
+    # All probes 1x
+    # -------------------------------------------------------
+    ip = "192.168.3.150"
+
+    # create a scpi object.
+    Pitaya = scpi.scpi(ip)
+
+    Scope = redpitaya_scope(Pitaya)
+    Generator = redpitaya_generator(Pitaya)
+
+    # The resonance peak does not fit in LV
+    Scope.SetInputGain(Channel=1, Gain="HV")
+    Scope.SetInputGain(Channel=2, Gain="LV")
+    Scope.SetProbeGain(Probe=1, Gain=1)
+    Scope.SetProbeGain(Probe=2, Gain=1)
+    Scope.SetAverage(0)
+
+    Sweep = sine_sweep(Scope, Generator, Channel=1, Amplitude=0.5, InputChannel=2, OutputChannel=1)
+    Sweep.Periods = 10
+    Sweep.SettlingPeriods = 10
+    Sweep.MaxError_dB = 0.5
+
+    Result = Sweep.Run(FrequencyMin=100, FrequencyMax=20000, NrPoints=25)
+    Result.Save("sine_sweep_lc_filter.npz")
+
+    Pitaya.close()
+
+    plt.style.use("default")
+
+    fig = plt.figure()
+    plt.minorticks_on()
+    ax11 = plt.subplot(211)
+    ax11.grid(which="both")
+    plt.semilogx(Result.Freq, Result.GetMagnitude_dB(), "b.-")
+    ax11.set(ylabel="Gain [dB]", xlabel="Frequency [Hz]", title="Stepped sine (" + str(len(Result)) + " frequencies)")
+
+    # 1 dB on gain plot.
+    ml = MultipleLocator(1)
+    ax11.yaxis.set_minor_locator(ml)
+    ax11.grid(which="minor", alpha=0.3)
+    ax11.grid(which="major", alpha=1.0)
+
+    ax12 = plt.subplot(212)
+    ax12.grid(which="both")
+    plt.semilogx(Result.Freq, Result.GetPhase_deg(), "b.-")
+    ax12.set(ylabel="Phase [deg]", xlabel="Frequency [Hz]")
+
+    # 10 degree on phase plot
+    ml = MultipleLocator(10)
+    ax12.yaxis.set_minor_locator(ml)
+    ax12.grid(which="minor", alpha=0.3)
+    ax12.grid(which="major", alpha=1.0)
+
+    mplcursors.cursor([ax11, ax12], multiple=True)
+
+    plt.show()
+
+
+if __name__ == "__main__":
+    main()
@@ -56,10 +56,10 @@ def do_measurement(Scope, Data):
     Scope.SetTrigger(Trigger = "DISABLED")
     Scope.Start()   
     
-    # Sleep is only needed when trigger delay = 0 (middle of the data) 
+    # Waiting is only needed when trigger delay = 0 (middle of the data) 
     # In that case we want to make sure the pre-trigger buffer is full
     # before setting the actual trigger.
-    time.sleep(1)
+    Scope.WaitForPreTrigger(Delay = 8192)
     
     # Scope.SetTrigger(Trigger = "CH1_PE", Level = 0.1, Delay = 0)
     # Scope.SetTrigger(Trigger = "NOW")
@@ -68,27 +68,27 @@ def do_measurement(Scope, Data):
     
     Scope.WaitForTrigger()
     
-    # Timing with the scpi interface is not very good.
-    # Quite some timing overhead seems to be present.
-    
-    # WaitForTrigger() returns immediately after the trigger event
-    # and does not wait for the buffer to fill to the end.
-    # Add sleep(some number) if data seems not oke.
-    # sleep time can be calculated based on the sample frequency and the
-    # number of samples after the trigger event.
-    
-    time.sleep(1)
+    # WaitForTrigger() returns when the buffer after the trigger is full.
     
     # Data1 = Scope.GetGain(1) * Scope.GetData_Txt(Channel = 1)
     # Data2 = Scope.GetGain(2) * Scope.GetData_Txt(Channel = 2)
     
     Data.add_data("Time", Scope.GetTimeVector() * 1000)
-    Data.add_data("Channel 1",  Scope.GetGain(1) * Scope.GetData_Txt(Channel = 1))
-    Data.add_data("Channel 2",  Scope.GetGain(1) * Scope.GetData_Txt(Channel = 2))
+    Data1, Data2 = Scope.GetDataBoth()
+    Data.add_data("Channel 1",  Data1)
+    Data.add_data("Channel 2",  Data2)
 
     Data.add_data("TriggerTime", Scope.GetTriggerVector() * 1000)
     Data.add_data("TriggerData", Scope.GetTriggerData())
 
+    # Stored with the columns in the file
+    Data.set_attrs("Time", units='msec')
+    Data.set_attrs("Channel 1", units='V', scope=Scope.GetSettings())
+    Data.set_attrs("Channel 2", units='V', scope=Scope.GetSettings())
+
+    # Written to the file by the background writer
+    Data.end_capture()
+
     # Pitaya.tx_txt('ACQ:STOP');
     
     print("Trigger delay   : %.6f Sec"  % ((8192-0)/Scope.Frequency))
@@ -158,7 +158,9 @@ def SetPlotXAxis(Scope, Data, axis):
     return
 
 def save_measurements(Scope, Data):
-    Data.save_data("Testing.dat")
+    # The captures are already in the file, this finishes it.
+    # The data is read back lazily from the file.
+    Data.close_stream()
     return
 
 def load_meausurements(Scope, Data):
@@ -188,10 +190,13 @@ def main():
     Scope = redpitaya_scope(Pitaya);  
     
     Data        = prepare_measurement(Scope, Data)
-    Data        = do_measurement(Scope, Data)
-    fig, axes   = plot_measurement(Scope, Data)
     
+    # Stream the captures to disk while measuring
+    Data.open_stream("Testing.dat")
+    
+    Data        = do_measurement(Scope, Data)
     save_measurements(Scope, Data)
+    fig, axes   = plot_measurement(Scope, Data)
     
     mplcursors.cursor(axes, multiple=True)
 
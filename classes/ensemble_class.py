@@ -0,0 +1,114 @@
+import numpy as np
+
+#==============================================================================
+# Host side ensemble averaging of repeated (triggered) captures.
+# Running mean and variance (Welford), min/max envelopes
+# and an approximate median in float64. Memory is a few arrays of one
+# capture, independent of the number of captures.
+#
+# Average = ensemble_average()
+# for i in range(K):
+#     ... capture Data (2, N)
+#     Average.Add(Data)
+# plt.plot(x, Average.Mean[0])
+# plt.fill_between(x, Average.Min[0], Average.Max[0])
+#
+# The noise on the mean drops with sqrt(NrCaptures): Average.StdError.
+#==============================================================================
+class ensemble_average:
+
+    def __init__(self):
+        self.NrCaptures = 0
+        self.Mean       = None
+        self.M2         = None
+        self.Min        = None
+        self.Max        = None
+        self.Median     = None
+        return
+
+    #==============================================================================
+    # Data is one capture, with Batch = True the first axis are captures
+    # (e.g. the (K, 2, N) result of redpitaya_scope.CaptureBurst).
+    #==============================================================================
+    def Add(self, Data, Batch = False):
+        Data = np.asarray(Data, dtype=np.float64)
+        if not Batch:
+            Data = Data[np.newaxis]
+
+        Count = Data.shape[0]
+        if (Count == 0):
+            return
+
+        if self.Mean is None:
+            self.Mean   = np.zeros(Data.shape[1:])
+            self.M2     = np.zeros(Data.shape[1:])
+            self.Min    = np.full(Data.shape[1:], np.inf)
+            self.Max    = np.full(Data.shape[1:], -np.inf)
+            self.Median = Data[0].copy()
+
+        # One capture at a time (Welford), the median step of every capture
+        # needs the count and spread of all captures before it.
+        for Capture in Data:
+            self.UpdateMedian(Capture)
+
+            self.NrCaptures += 1
+            Delta = Capture - self.Mean
+            self.Mean += Delta / self.NrCaptures
+            self.M2   += Delta * (Capture - self.Mean)
+
+        np.minimum(self.Min, Data.min(axis=0), out=self.Min)
+        np.maximum(self.Max, Data.max(axis=0), out=self.Max)
+        return
+
+    #==============================================================================
+    # Stochastic approximation of the median: a step towards every new sample
+    # of size sqrt(2 pi) * std / k (optimal for normal distributed noise).
+    # Approximate, but it needs no history and ignores single outliers.
+    #==============================================================================
+    def UpdateMedian(self, Capture):
+        k = self.NrCaptures + 1
+        if (k < 3):
+            # No spread known yet: the first captures set the estimate
+            self.Median += (Capture - self.Median) / k
+            return
+
+        Step = np.sqrt(2 * np.pi) * np.sqrt(self.M2 / (k - 2)) / k
+        self.Median += Step * np.sign(Capture - self.Median)
+        return
+
+    @property
+    def Variance(self):
+        if (self.NrCaptures < 2):
+            return np.zeros_like(self.Mean)
+        return self.M2 / (self.NrCaptures - 1)
+
+    @property
+    def Std(self):
+        return np.sqrt(self.Variance)
+
+    # Standard deviation of the mean
+    @property
+    def StdError(self):
+        return self.Std / np.sqrt(max(self.NrCaptures, 1))
+
+    def Reset(self):
+        self.__init__()
+        return
+
+    #==============================================================================
+    # Store / load all results in one .npz file
+    #==============================================================================
+    def Save(self, Filename):
+        np.savez(Filename, NrCaptures=self.NrCaptures, Mean=self.Mean, M2=self.M2,
+                 Min=self.Min, Max=self.Max, Median=self.Median)
+        return
+
+    def Load(self, Filename):
+        with np.load(Filename) as Data:
+            self.NrCaptures = int(Data['NrCaptures'])
+            self.Mean       = Data['Mean']
+            self.M2         = Data['M2']
+            self.Min        = Data['Min']
+            self.Max        = Data['Max']
+            self.Median     = Data['Median']
+        return
@@ -0,0 +1,219 @@
+import numpy as np
+
+#==============================================================================
+# Frequency response function (FRF) estimation.
+# Welch averaging: every capture is split in overlapping, windowed segments,
+# all segments of all captures are transformed in one batched rfft and the
+# auto/cross spectra are averaged in the complex domain.
+#
+#   H1 = Sxy / Sxx   (unbiased for noise on the output)
+#   H2 = Syy / Syx   (unbiased for noise on the input)
+#   Coherence = |Sxy|^2 / (Sxx Syy)
+#
+# Estimator = frf_estimator(SampleFrequency = Scope.Frequency, SegmentLength = 4096)
+# Result    = Estimator.Estimate(Input = Data2, Output = Data1)
+# plt.semilogx(Result.Freq, Result.GetMagnitude_dB())
+#==============================================================================
+class frf_estimator:
+
+    def __init__(self, SampleFrequency, SegmentLength = None, Overlap = 0.5, Window = 'hann'):
+        self.SampleFrequency = SampleFrequency
+        self.SegmentLength   = SegmentLength
+        self.Overlap         = Overlap
+        self.Window          = Window
+        return
+
+    def GetWindow(self, Length):
+        if (self.Window == 'hann'):
+            return np.hanning(Length)
+        if (self.Window == 'hamming'):
+            return np.hamming(Length)
+        if (self.Window == 'blackman'):
+            return np.blackman(Length)
+        if (self.Window in ('rect', 'none', None)):
+            return np.ones(Length)
+        raise ValueError('FRF >> unknown window: ' + str(self.Window))
+
+    #==============================================================================
+    # Split a (N, NrSamples) stack in segments: (N, Segments, SegmentLength)
+    # The segments are views, no data is copied.
+    #==============================================================================
+    def GetSegments(self, Data):
+        Data   = np.atleast_2d(Data)
+        Length = self.SegmentLength or Data.shape[-1]
+
+        if (Length > Data.shape[-1]):
+            raise ValueError('FRF >> segment length %d longer than the capture (%d)' % (Length, Data.shape[-1]))
+
+        Step = max(1, int(round(Length * (1.0 - self.Overlap))))
+        return np.lib.stride_tricks.sliding_window_view(Data, Length, axis=-1)[:, ::Step, :]
+
+    #==============================================================================
+    # Windowed one sided spectra of all segments: (N, Segments, Length//2 + 1)
+    #==============================================================================
+    def GetSpectra(self, Data):
+        Segments = self.GetSegments(Data)
+        Window   = self.GetWindow(Segments.shape[-1])
+        return np.fft.rfft(Segments * Window, axis=-1)
+
+    def Estimate(self, Input, Output):
+        X = self.GetSpectra(Input)
+        Y = self.GetSpectra(Output)
+
+        Result = frf_result(self.SampleFrequency, X.shape[-1], self.GetWindow(self.GetSegments(Input).shape[-1]))
+        Result.Add(X, Y)
+        return Result
+
+
+#==============================================================================
+# Averaged auto/cross spectra and the FRF estimates derived from them.
+#==============================================================================
+class frf_result:
+
+    def __init__(self, SampleFrequency, NrFrequencies, Window):
+        Length = len(Window)
+
+        self.SampleFrequency = SampleFrequency
+        self.SegmentLength   = Length
+        self.Freq            = np.fft.rfftfreq(Length, 1.0 / SampleFrequency)
+        self.Sxx             = np.zeros(NrFrequencies)
+        self.Syy             = np.zeros(NrFrequencies)
+        self.Sxy             = np.zeros(NrFrequencies, dtype=complex)
+        self.NrAverages      = 0
+
+        # One sided power spectral density scaling
+        self.Scale           = 2.0 / (SampleFrequency * np.sum(Window**2))
+        return
+
+    #==============================================================================
+    # Add spectra (..., NrFrequencies) to the running averages.
+    #==============================================================================
+    def Add(self, X, Y):
+        X = X.reshape(-1, X.shape[-1])
+        Y = Y.reshape(-1, Y.shape[-1])
+
+        Count = X.shape[0]
+        Total = self.NrAverages + Count
+
+        self.Sxx += (np.sum(np.abs(X)**2, axis=0) - Count * self.Sxx) / Total
+        self.Syy += (np.sum(np.abs(Y)**2, axis=0) - Count * self.Syy) / Total
+        self.Sxy += (np.sum(np.conj(X) * Y, axis=0) - Count * self.Sxy) / Total
+        self.NrAverages = Total
+        return
+
+    @property
+    def H1(self):
+        with np.errstate(divide='ignore', invalid='ignore'):
+            return self.Sxy / self.Sxx
+
+    @property
+    def H2(self):
+        with np.errstate(divide='ignore', invalid='ignore'):
+            return self.Syy / np.conj(self.Sxy)
+
+    @property
+    def Coherence(self):
+        with np.errstate(divide='ignore', invalid='ignore'):
+            return np.abs(self.Sxy)**2 / (self.Sxx * self.Syy)
+
+    def GetPSD(self, Channel = 'Input'):
+        if (Channel == 'Input'):
+            return self.Sxx * self.Scale
+        return self.Syy * self.Scale
+
+    def GetH(self, Estimator = 'H1'):
+        if (Estimator == 'H2'):
+            return self.H2
+        return self.H1
+
+    def GetMagnitude_dB(self, Estimator = 'H1'):
+        with np.errstate(divide='ignore'):
+            return 20 * np.log10(np.abs(self.GetH(Estimator)))
+
+    def GetPhase_deg(self, Estimator = 'H1'):
+        return np.angle(self.GetH(Estimator), deg=True)
+
+
+#==============================================================================
+# Streaming FRF: the spectra are added per capture while the measurement
+# runs. Memory does not depend on the number of captures.
+#
+# Accumulator = frf_accumulator(SampleFrequency = Scope.Frequency, SegmentLength = 4096)
+# for i in range(N):
+#     ... capture Data1 (output) and Data2 (input)
+#     Accumulator.Add(Input = Data2, Output = Data1)
+#     if Accumulator.IsConverged(Coherence = 0.9, Error = 0.02):
+#         break
+# Result = Accumulator.Result
+#==============================================================================
+class frf_accumulator:
+
+    def __init__(self, SampleFrequency, SegmentLength = None, Overlap = 0.5, Window = 'hann', Band = None):
+        self.Estimator   = frf_estimator(SampleFrequency, SegmentLength, Overlap, Window)
+        self.Band        = Band
+        self.Result      = None
+        self.NrCaptures  = 0
+        self.Change      = np.inf
+        return
+
+    def Add(self, Input, Output):
+        X = self.Estimator.GetSpectra(Input)
+        Y = self.Estimator.GetSpectra(Output)
+
+        if self.Result is None:
+            Window = self.Estimator.GetWindow(self.Estimator.GetSegments(Input).shape[-1])
+            self.Result = frf_result(self.Estimator.SampleFrequency, X.shape[-1], Window)
+
+        Mask = self.GetMask()
+        Old  = self.Result.H1[Mask]
+
+        self.Result.Add(X, Y)
+        self.NrCaptures += 1
+
+        # Relative change of H1 in the band by this capture
+        if (self.NrCaptures > 1):
+            New = self.Result.H1[Mask]
+            Valid = np.isfinite(Old) & np.isfinite(New)
+            self.Change = np.linalg.norm(New[Valid] - Old[Valid]) / max(np.linalg.norm(New[Valid]), 1e-300)
+
+        return self.Result
+
+    #==============================================================================
+    # Frequencies used for the convergence checks: Band = (f_min, f_max)
+    # or everything except DC.
+    #==============================================================================
+    def GetMask(self):
+        Freq = self.Result.Freq
+        if self.Band is None:
+            return Freq > 0
+        return (Freq >= self.Band[0]) & (Freq <= self.Band[1])
+
+    #==============================================================================
+    # Normalized random error of |H1| (Bendat & Piersol):
+    #   sqrt(1 - coh) / (sqrt(coh) * sqrt(2 * NrAverages))
+    # Overlapping segments are not independent, so this is optimistic.
+    #==============================================================================
+    def GetRandomError(self):
+        Coherence = np.clip(self.Result.Coherence, 1e-12, 1.0)
+        return np.sqrt(1.0 - Coherence) / (np.sqrt(Coherence) * np.sqrt(2 * self.Result.NrAverages))
+
+    def GetConvergence(self):
+        if self.Result is None:
+            return np.inf
+        return np.median(self.GetRandomError()[self.GetMask()])
+
+    def GetMeanCoherence(self):
+        if self.Result is None:
+            return 0.0
+        return np.nanmean(self.Result.Coherence[self.GetMask()])
+
+    def IsConverged(self, Coherence = None, Error = None, Change = None, MinCaptures = 2):
+        if (self.NrCaptures < MinCaptures):
+            return False
+        if (Coherence is not None) and (self.GetMeanCoherence() < Coherence):
+            return False
+        if (Error is not None) and (self.GetConvergence() > Error):
+            return False
+        if (Change is not None) and (self.Change > Change):
+            return False
+        return True
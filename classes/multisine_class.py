@@ -0,0 +1,163 @@
+import numpy as np
+from frf_class import frf_estimator
+
+#==============================================================================
+# Periodic multisine excitation for the arbitrary generator.
+# The generator buffer (16384 samples) holds one period of a sum of sines,
+# the buffer is repeated at GeneratorFrequency = SampleFrequency * Periods /
+# NrSamples. A scope record then holds exactly Periods periods and every line
+# falls on an FFT bin: no leakage, no window, no averaging needed against it.
+#
+# Design = multisine(SampleFrequency = Scope.Frequency, FrequencyMin = 10, FrequencyMax = 20000)
+# Generator.Arbitrary(Channel = 1, Samples = Design.Samples, Amplitude = 0.5,
+#                     Frequency = Design.GeneratorFrequency)
+# ... capture Data1 (output) and Data2 (input), Decimation unchanged
+# Result = Design.Estimate(Input = Data2, Output = Data1)
+# plt.semilogx(Design.Freq, Design.GetMagnitude_dB(Result))
+#
+# Phase = 'schroeder': Schroeder phases (low crest factor, no iterations)
+#         'random'   : random phases (Seed)
+#         'optimized': Schroeder phases improved by iterative clipping
+# Spacing = 'linear' (all bins in the band) or 'log' (NrLines bins)
+#
+# The lines are exact as long as the generator frequency is; a frequency
+# error of the generator shows as leakage next to the lines.
+#==============================================================================
+class multisine:
+
+    def __init__(self, SampleFrequency, FrequencyMin, FrequencyMax, NrLines = None, Spacing = 'linear',
+                 Phase = 'schroeder', Periods = 1, NrSamples = 16384, BufferSize = 16384,
+                 Iterations = 100, Seed = None):
+        if (NrSamples % Periods != 0):
+            raise ValueError('Multisine >> %d periods do not fit in %d samples' % (Periods, NrSamples))
+
+        self.SampleFrequency    = SampleFrequency
+        self.NrSamples          = NrSamples
+        self.BufferSize         = BufferSize
+        self.Periods            = Periods
+        self.SegmentLength      = NrSamples // Periods
+
+        # Frequency of one multisine period: the spacing of the FFT bins of a period
+        self.Resolution         = SampleFrequency / self.SegmentLength
+        self.GeneratorFrequency = self.Resolution
+
+        self.Lines              = self.GetLines(FrequencyMin, FrequencyMax, NrLines, Spacing)
+        self.Freq               = self.Lines * self.Resolution
+        self.Amplitudes         = np.ones(len(self.Lines))
+
+        self.Phases             = self.GetPhases(Phase, Iterations, Seed)
+        self.Samples            = self.GetSamples(self.Phases)
+        self.CrestFactor        = GetCrestFactor(self.Samples)
+        return
+
+    #==============================================================================
+    # FFT bins (of one period) in the band, 'log' picks NrLines bins log spaced.
+    #==============================================================================
+    def GetLines(self, FrequencyMin, FrequencyMax, NrLines, Spacing):
+        First = max(1, int(np.ceil(FrequencyMin / self.Resolution)))
+        Last  = min(int(np.floor(FrequencyMax / self.Resolution)), self.SegmentLength // 2 - 1,
+                    self.BufferSize // 2 - 1)
+
+        if (Last < First):
+            raise ValueError('Multisine >> no FFT bin between %.1f Hz and %.1f Hz (resolution %.3f Hz)' %
+                             (FrequencyMin, FrequencyMax, self.Resolution))
+
+        if (Spacing == 'linear'):
+            Lines = np.arange(First, Last + 1)
+            if (NrLines is not None) and (NrLines < len(Lines)):
+                Lines = Lines[np.round(np.linspace(0, len(Lines) - 1, NrLines)).astype(int)]
+            return np.unique(Lines)
+
+        if (Spacing == 'log'):
+            if NrLines is None:
+                NrLines = 100
+            return np.unique(np.round(np.geomspace(First, Last, NrLines)).astype(int))
+
+        raise ValueError('Multisine >> unknown spacing: ' + str(Spacing))
+
+    #==============================================================================
+    # Schroeder: phi_k = -2 pi sum_{l<k} (n_k - n_l) p_l, n_k = bin number and
+    # p_l = relative power of line l. For a flat spectrum on consecutive bins
+    # this is -pi k (k - 1) / K.
+    #==============================================================================
+    def GetPhases(self, Phase, Iterations, Seed):
+        Power = self.Amplitudes**2 / np.sum(self.Amplitudes**2)
+        n     = self.Lines
+
+        # sum_{l<k} (n_k - n_l) p_l = n_k * P(k) - sum_{l<k} n_l p_l
+        Before    = np.concatenate(([0.0], np.cumsum(Power)[:-1]))
+        BeforeBin = np.concatenate(([0.0], np.cumsum(n * Power)[:-1]))
+        Schroeder = -2 * np.pi * (n * Before - BeforeBin)
+
+        if (Phase == 'schroeder'):
+            return Schroeder
+        if (Phase == 'random'):
+            return np.random.default_rng(Seed).uniform(-np.pi, np.pi, len(self.Lines))
+        if (Phase == 'optimized'):
+            return self.OptimizePhases(Schroeder, Iterations)
+
+        raise ValueError('Multisine >> unknown phase: ' + str(Phase))
+
+    #==============================================================================
+    # Iterative clipping (Van der Ouderaa): clip the peaks of the time signal,
+    # keep only the new phases of the lines, repeat. The best phases are kept.
+    #==============================================================================
+    def OptimizePhases(self, Phases, Iterations, Clip = 0.9):
+        Best     = Phases
+        BestCF   = GetCrestFactor(self.GetSamples(Phases))
+
+        for i in range(Iterations):
+            x = self.GetSamples(Phases)
+            Level = Clip * np.max(np.abs(x))
+            X = np.fft.rfft(np.clip(x, -Level, Level))
+
+            Phases = np.angle(X[self.Lines])
+            CF = GetCrestFactor(self.GetSamples(Phases))
+            if (CF < BestCF):
+                Best, BestCF = Phases, CF
+
+        return Best
+
+    #==============================================================================
+    # One period in BufferSize samples, scaled to a peak of 1.
+    #==============================================================================
+    def GetSamples(self, Phases):
+        Spectrum = np.zeros(self.BufferSize // 2 + 1, dtype=complex)
+        Spectrum[self.Lines] = self.Amplitudes * np.exp(1j * Phases)
+
+        x = np.fft.irfft(Spectrum, self.BufferSize)
+        return x / np.max(np.abs(x))
+
+    #==============================================================================
+    # FRF of (a stack of) captures: every period of every capture is one
+    # rectangular Welch segment. With 2 or more periods the coherence is
+    # meaningful. Returns a frf_result, Design.Lines selects the excited bins.
+    #==============================================================================
+    def Estimate(self, Input, Output):
+        Estimator = frf_estimator(self.SampleFrequency, SegmentLength = self.SegmentLength, Overlap = 0.0, Window = 'rect')
+        return Estimator.Estimate(Input, Output)
+
+    def GetH(self, Result, Estimator = 'H1'):
+        return Result.GetH(Estimator)[self.Lines]
+
+    def GetMagnitude_dB(self, Result, Estimator = 'H1'):
+        return Result.GetMagnitude_dB(Estimator)[self.Lines]
+
+    def GetPhase_deg(self, Result, Estimator = 'H1'):
+        return Result.GetPhase_deg(Estimator)[self.Lines]
+
+    def PrintSettings(self):
+        print("-------------------------------------------")
+        print("Multisine")
+        print("-------------------------------------------")
+        print("Lines           : %d (%.1f Hz - %.1f Hz)" % (len(self.Lines), self.Freq[0], self.Freq[-1]))
+        print("Resolution      : %.3f Hz" % self.Resolution)
+        print("Generator freq  : %.6f Hz" % self.GeneratorFrequency)
+        print("Periods         : %d per capture" % self.Periods)
+        print("Crest factor    : %.2f" % self.CrestFactor)
+        print("-------------------------------------------")
+        return
+
+
+def GetCrestFactor(x):
+    return np.max(np.abs(x)) / np.sqrt(np.mean(x**2))
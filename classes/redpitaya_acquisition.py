@@ -0,0 +1,113 @@
+import time
+import threading
+import collections
+from redpitaya_class import TriggerTimeout
+
+#==============================================================================
+# Acquisition thread for the live scope scripts.
+# The thread calls Capture() (arm, wait for the trigger, download) as fast as
+# the board and network allow and puts the results in a bounded queue. When
+# the plot falls behind the oldest captures are dropped, the plot only shows
+# the latest one.
+#
+# Acquisition = redpitaya_acquisition(lambda: Capture(Scope), QueueSize = 4)
+# Acquisition.Start()
+# while True:
+#     Item = Acquisition.GetLatest(Timeout = 0.1)
+#     if Item is not None:
+#         Sequence, Timestamp, Data = Item
+# Acquisition.Stop()
+#
+# While the thread runs only the thread uses the scpi connection.
+# A TriggerTimeout from Capture() (no trigger) is not an error, it is retried.
+# Any other exception, a socket timeout included, stops the thread.
+#==============================================================================
+class redpitaya_acquisition:
+
+    def __init__(self, Capture, QueueSize = 4):
+        self.Capture    = Capture
+        self.Queue      = collections.deque(maxlen = QueueSize)
+        self.Condition  = threading.Condition()
+        self.Running    = False
+        self.Thread     = None
+        self.Error      = None
+        self.Sequence   = 0
+        self.NrDropped  = 0
+        return
+
+    def Start(self):
+        self.Running = True
+        self.Thread  = threading.Thread(target=self.Run, name='redpitaya_acquisition', daemon=True)
+        self.Thread.start()
+        return
+
+    #==============================================================================
+    # The running Capture() is finished first, Timeout limits the wait.
+    #==============================================================================
+    def Stop(self, Timeout = 5.0):
+        self.Running = False
+        if self.Thread is not None:
+            self.Thread.join(Timeout)
+        self.Check()
+        return
+
+    def Check(self):
+        if self.Error is not None:
+            raise RuntimeError('Acquisition >> capture failed') from self.Error
+        return
+
+    def Run(self):
+        while self.Running:
+            try:
+                Data = self.Capture()
+            except TriggerTimeout:
+                continue
+            except Exception as e:
+                self.Error   = e
+                self.Running = False
+                break
+
+            with self.Condition:
+                # deque(maxlen) drops the oldest capture when full
+                if (len(self.Queue) == self.Queue.maxlen):
+                    self.NrDropped += 1
+
+                self.Queue.append((self.Sequence, time.time(), Data))
+                self.Sequence += 1
+                self.Condition.notify()
+
+        with self.Condition:
+            self.Condition.notify_all()
+        return
+
+    #==============================================================================
+    # Latest capture (Sequence, Timestamp, Data), older ones in the queue are
+    # dropped. None when no capture arrived within Timeout.
+    #==============================================================================
+    def GetLatest(self, Timeout = None):
+        with self.Condition:
+            if not self.Queue:
+                self.Condition.wait_for(lambda: self.Queue or not self.Running, Timeout)
+            self.Check()
+
+            if not self.Queue:
+                return None
+
+            Item = self.Queue.pop()
+            self.NrDropped += len(self.Queue)
+            self.Queue.clear()
+            return Item
+
+    #==============================================================================
+    # Oldest capture, for consumers that want every capture that was not dropped.
+    #==============================================================================
+    def Get(self, Timeout = None):
+        with self.Condition:
+            if not self.Queue:
+                self.Condition.wait_for(lambda: self.Queue or not self.Running, Timeout)
+            self.Check()
+
+            if not self.Queue:
+                return None
+
+            return self.Queue.popleft()
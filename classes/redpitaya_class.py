@@ -1,9 +1,8 @@
 import sys
 import time
+import hashlib
 import redpitaya_scpi as scpi
 import numpy as np
-import math
-import random
 
 # https://github.com/RedPitaya/RedPitaya/blob/master/scpi-server/src/scpi-commands.c#L96-L204
 # <source> = {DISABLED, NOW, CH1_PE, CH1_NE, CH2_PE, CH2_NE, EXT_PE, EXT_NE, AWG_PE, AWG_NE} Default: DISABLED
@@ -18,6 +17,14 @@ import random
 # Set the signal frequency of a fast analog output.
 # For the ARBITRARY waveform, this is the frequency of one signal period (a buffer of 16384 samples).
 
+#==============================================================================
+# No trigger (or no full buffer) within the timeout. Not a socket timeout:
+# that one leaves a reply half read and the connection out of sync.
+#==============================================================================
+class TriggerTimeout(TimeoutError):
+    pass
+
+
 #==============================================================================
 # Scope class
 #==============================================================================
@@ -34,55 +41,359 @@ class redpitaya_scope:
     Decimation_Array      = np.array([1, 8, 64, 1024, 8192, 65536])
     Decimation_Array_Beta = np.array([1, 2, 4, 8, 16, 32, 64, 128, 256, 512, 1024, 2048, 4096, 8192, 16384, 32768, 65536])
     Average               = 0;
+    DataFormat            = 'ASCII'
+    DataUnits             = 'VOLTS'
+    PollInterval          = 0.001
+    PollIntervalMax       = 0.05
+    UseTriggerFill        = False  # ACQ:TRIG:FILL? needs a recent firmware
+    WindowMode            = 'FULL'
+    WindowLength          = int(16384)
+    WindowStart           = 0
+    WindowPreTrigger      = None
+    TriggerPosition       = None
+    TriggerTime           = None
     
     def __init__(self, pitaya):
         self.rp = pitaya
-        self.rp.tx_txt('ACQ:DATA:FORMAT ASCII')
-        self.rp.tx_txt('ACQ:RST')
-        self.rp.tx_txt('ACQ:START')
+
+        # Per object copies, the class arrays would be shared by all boards.
+        self.Gain  = self.Gain.copy()
+        self.Probe = self.Probe.copy()
+
+        with self.rp.batch():
+            self.Reset()
+            self.rp.tx_txt('ACQ:START')
+        return
+
+    #==============================================================================
+    # ACQ:RST sets the acquisition to its defaults, the scpi object forgets
+    # the ACQ settings it has send so all of them are written again.
+    #==============================================================================
+    def Reset(self):
+        with self.rp.batch():
+            self.rp.tx_txt('ACQ:RST')
+            self.WriteDataFormat()
+            self.SetInputGain(Channel = 1, Gain = 'LV' if (self.Gain[0] == 1) else 'HV')
+            self.SetInputGain(Channel = 2, Gain = 'LV' if (self.Gain[1] == 1) else 'HV')
         return
     
+    #==============================================================================
+    # All commands are send in one write (one TCP packet).
+    # Settings that did not change are not send again (see scpi.tx_set).
+    # ACQ:TRIG is always send, the board disables the trigger after an event.
+    # Without ACQ:RST the trigger is set after ACQ:START, as in the RP examples.
+    #==============================================================================
     def Start(self):
-        self.rp.tx_txt('ACQ:RST')
-        self.rp.tx_txt('ACQ:DATA:FORMAT ASCII')
-        self.WriteDecimation()
-        self.WriteTrigger()
-        self.rp.tx_txt('ACQ:START')
-        self.rp.tx_txt('DIG:PIN LED0, 1')
+        self.TriggerPosition = None
+
+        with self.rp.batch():
+            self.WriteDataFormat()
+            self.WriteDecimation()
+            self.rp.tx_txt('ACQ:START')
+            self.WriteTrigger()
+            self.rp.tx_txt('DIG:PIN LED0, 1')
         return
 
-    def WaitForTrigger(self):
+    #==============================================================================
+    # Poll the trigger status with an increasing interval (PollInterval up to
+    # PollIntervalMax) and return when the buffer after the trigger is full.
+    # Timeout in seconds, None waits forever.
+    # TriggerTime is the time.time() of the status poll that saw TD, the
+    # trigger was between the previous poll and this one.
+    #==============================================================================
+    def WaitForTrigger(self, Timeout = None):
+        Start    = time.perf_counter()
+        Interval = self.PollInterval
+
         while 1:
-            self.rp.tx_txt('ACQ:TRIG:STAT?')
-        
-            answer = self.rp.rx_txt()
-            print(answer)
+            Now    = time.time()
+            answer = self.rp.txrx_txt('ACQ:TRIG:STAT?')
         
             if 'TD' in answer:
+                self.TriggerTime = Now
                 break
+
+            if (Timeout is not None) and (time.perf_counter() - Start > Timeout):
+                raise TriggerTimeout('Scope >> no trigger within %.3f sec' % Timeout)
+
+            time.sleep(Interval)
+            Interval = min(2 * Interval, self.PollIntervalMax)
         
         # make sure the data is ready
-        # to do: especially on slow measurements.
-        time.sleep(0.1)
+        self.WaitForFill(Timeout)
         self.rp.tx_txt('DIG:PIN LED0, 0')
         # self.rp.tx_txt('ACQ:STOP')
        
         return
 
+    #==============================================================================
+    # The trigger status changes to TD on the trigger event, the samples after
+    # the trigger still have to be written. With UseTriggerFill the board is
+    # asked (ACQ:TRIG:FILL?), otherwise the computed fill time is waited.
+    #==============================================================================
+    def WaitForFill(self, Timeout = None):
+        FillTime = self.GetPostTriggerTime()
+
+        if not self.UseTriggerFill:
+            time.sleep(FillTime)
+            return
+
+        Start    = time.perf_counter()
+        Interval = max(self.PollInterval, FillTime / 4)
+
+        while 1:
+            answer = self.rp.txrx_txt('ACQ:TRIG:FILL?')
+
+            if '1' in answer:
+                break
+
+            if (Timeout is not None) and (time.perf_counter() - Start > Timeout):
+                raise TriggerTimeout('Scope >> buffer not filled within %.3f sec' % Timeout)
+
+            time.sleep(Interval)
+            Interval = min(2 * Interval, self.PollIntervalMax)
+        return
+
+    #==============================================================================
+    # After Start() the samples before the trigger need to be written before
+    # the trigger is set, otherwise the start of the data is old.
+    # Delay is the trigger delay that will be used, default the current one.
+    #==============================================================================
+    def WaitForPreTrigger(self, Delay = None):
+        time.sleep(self.GetPreTriggerTime(Delay))
+        return
+
+    def GetPreTriggerTime(self, Delay = None):
+        if Delay is None:
+            Delay = self.TriggerDelay
+        Samples = np.clip(self.NrSamples // 2 - Delay, 0, self.NrSamples)
+        return Samples * self.Decimation / self.SampleFrequency
+
+    def GetPostTriggerTime(self, Delay = None):
+        if Delay is None:
+            Delay = self.TriggerDelay
+        Samples = np.clip(self.NrSamples // 2 + Delay, 0, self.NrSamples)
+        return Samples * self.Decimation / self.SampleFrequency
+
     def Stop(self):
          self.rp.tx_txt('ACQ:STOP')
          return
     
     def GetData_Txt(self, Channel = 1):
         
-        if (Channel == 1):
-            self.rp.tx_txt('ACQ:SOUR1:DATA?')
-        else:
-            self.rp.tx_txt('ACQ:SOUR2:DATA?')
+        if (self.DataFormat != 'ASCII'):
+            self.SetDataFormat('ASCII', self.DataUnits)
+
+        self.rp.tx_txt(self.GetDataQuery(Channel))
             
-        buff_string = self.rp.rx_txt()
-        buff_string = buff_string.strip('{}\n\r')
+        buff_string = self.rp.rx_bytes()
+        buff_string = buff_string.strip(b'{}\n\r')
         return np.fromstring(buff_string, sep=',')
+
+    #==============================================================================
+    # Binary transfer of the data buffer (ACQ:DATA:FORMAT BIN).
+    # About 4x less bytes than ASCII with VOLTS and 8x less with RAW.
+    # Units = 'VOLTS' : float32 in Volt (on ADC level), same as GetData_Txt
+    # Units = 'RAW'   : int16 ADC counts
+    #==============================================================================
+    def GetData_Bin(self, Channel = 1, Units = 'VOLTS'):
+        if (self.DataFormat != 'BIN') or (self.DataUnits != Units):
+            self.SetDataFormat('BIN', Units)
+
+        self.rp.tx_txt(self.GetDataQuery(Channel))
+
+        if (Units == 'RAW'):
+            return self.rp.rx_bin('>i2').astype(np.int16)
+
+        return self.rp.rx_bin('>f4').astype(np.float32)
+
+    #==============================================================================
+    # Both channels in one round trip: the two DATA? queries are send in one
+    # write and both binary replies are received directly in a (2, NrSamples)
+    # float32 array, scaled with GetGain in place. Out can be reused.
+    # With a window (SetWindow) the array is (2, window length).
+    #==============================================================================
+    def GetDataBoth(self, Out = None):
+        if (self.DataFormat != 'BIN') or (self.DataUnits != 'VOLTS'):
+            self.SetDataFormat('BIN', 'VOLTS')
+
+        if Out is None:
+            Out = np.empty((2, self.GetWindowLength()), dtype=np.float32)
+
+        Query1 = self.GetDataQuery(1)
+        Query2 = self.GetDataQuery(2)
+
+        with self.rp.batch(read_replies = False):
+            self.rp.tx_txt(Query1)
+            self.rp.tx_txt(Query2)
+
+        self.rp.rx_bin('>f4', out = Out[0])
+        self.rp.rx_bin('>f4', out = Out[1])
+
+        Out[0] *= self.GetGain(1)
+        Out[1] *= self.GetGain(2)
+        return Out
+
+    #==============================================================================
+    # Burst capture: K triggered captures back to back, returns a (K, 2, N)
+    # float32 array (scaled with GetGain) and the TriggerTime of each capture:
+    # the time.time() at which the trigger was seen (see WaitForTrigger), not
+    # the end of the post-trigger fill.
+    # The re-arm (ACQ:START, ACQ:TRIG) is send in the same write as the data
+    # queries of the previous capture, the board is armed again as soon as the
+    # data is read. When the trigger delay needs a pre-trigger buffer, the
+    # trigger is only set after the pre-trigger time (see WaitForPreTrigger).
+    # Timeout is per capture.
+    #==============================================================================
+    def CaptureBurst(self, K, Out = None, Timeout = None):
+        if (self.DataFormat != 'BIN') or (self.DataUnits != 'VOLTS'):
+            self.SetDataFormat('BIN', 'VOLTS')
+
+        if Out is None:
+            Out = np.empty((K, 2, self.GetWindowLength()), dtype=np.float32)
+
+        Timestamps  = np.empty(K)
+        PreTrigger  = self.GetPreTriggerTime()
+
+        self.Arm(PreTrigger)
+
+        for k in range(K):
+            self.WaitForTrigger(Timeout)
+            Timestamps[k] = self.TriggerTime
+
+            Query1 = self.GetDataQuery(1)
+            Query2 = self.GetDataQuery(2)
+            self.TriggerPosition = None
+
+            with self.rp.batch(read_replies = False):
+                self.rp.tx_txt(Query1)
+                self.rp.tx_txt(Query2)
+
+                if (k < K - 1):
+                    self.rp.tx_txt('ACQ:START')
+                    if (PreTrigger == 0):
+                        self.WriteTrigger()
+
+            Armed = time.perf_counter()
+            self.rp.rx_bin('>f4', out = Out[k, 0])
+            self.rp.rx_bin('>f4', out = Out[k, 1])
+
+            if (k < K - 1) and (PreTrigger > 0):
+                time.sleep(max(0.0, PreTrigger - (time.perf_counter() - Armed)))
+                self.WriteTrigger()
+
+        Out[:, 0] *= self.GetGain(1)
+        Out[:, 1] *= self.GetGain(2)
+        return Out, Timestamps
+
+    # Start without ACQ:RST, the trigger is set after the pre-trigger time.
+    def Arm(self, PreTrigger = 0):
+        self.TriggerPosition = None
+
+        with self.rp.batch():
+            self.WriteDataFormat()
+            self.WriteDecimation()
+            self.rp.tx_txt('ACQ:START')
+            if (PreTrigger == 0):
+                self.WriteTrigger()
+
+        if (PreTrigger > 0):
+            time.sleep(PreTrigger)
+            self.WriteTrigger()
+        return
+
+    #==============================================================================
+    # Window reads: only a part of the buffer is transferred.
+    # Mode = 'FULL'    : the complete buffer (ACQ:SOURx:DATA?)
+    #        'TRIGGER' : Length samples around the trigger, PreTrigger samples
+    #                    before it (default Length/2)
+    #        'START'   : Length samples from Start (index in the full buffer)
+    #        'OLDEST'  : the first Length samples (ACQ:SOURx:DATA:OLD:N?)
+    #        'LATEST'  : the last Length samples (ACQ:SOURx:DATA:LAT:N?)
+    # TRIGGER and START read from the trigger position in the circular buffer
+    # (ACQ:TPOS?, once per capture) with ACQ:SOURx:DATA:STA:N?.
+    # GetTimeVector returns the time of the window samples in the time frame of
+    # the full buffer, so GetTriggerVector stays valid.
+    #==============================================================================
+    def SetWindow(self, Mode = 'TRIGGER', Length = 1024, PreTrigger = None, Start = 0):
+        Mode = Mode.upper()
+        if Mode not in ('FULL', 'TRIGGER', 'START', 'OLDEST', 'LATEST'):
+            raise ValueError('Scope >> unknown window mode: ' + Mode)
+
+        self.WindowMode       = Mode
+        self.WindowLength     = int(np.clip(Length, 1, self.NrSamples))
+        self.WindowStart      = int(Start)
+        self.WindowPreTrigger = PreTrigger
+        return
+
+    def GetWindowLength(self):
+        if (self.WindowMode == 'FULL'):
+            return self.NrSamples
+        return self.WindowLength
+
+    # Index of the first window sample in the full buffer. The window is kept
+    # inside the buffer, outside it the circular buffer holds older data.
+    def GetWindowStart(self):
+        if (self.WindowMode in ('FULL', 'OLDEST')):
+            return 0
+        if (self.WindowMode == 'LATEST'):
+            return self.NrSamples - self.WindowLength
+
+        if (self.WindowMode == 'START'):
+            Start = self.WindowStart
+        else:
+            PreTrigger = self.WindowPreTrigger
+            if PreTrigger is None:
+                PreTrigger = self.WindowLength // 2
+            Start = self.GetTriggerIndex() - PreTrigger
+
+        return int(np.clip(Start, 0, self.NrSamples - self.WindowLength))
+
+    # Index of the trigger in the full buffer, see SetTrigger
+    def GetTriggerIndex(self):
+        return self.NrSamples // 2 - self.TriggerDelay
+
+    def NeedsTriggerPosition(self):
+        return self.WindowMode in ('TRIGGER', 'START')
+
+    # Position of the trigger in the circular buffer of the board
+    def GetTriggerPosition(self):
+        if self.TriggerPosition is None:
+            self.TriggerPosition = int(self.rp.txrx_txt('ACQ:TPOS?'))
+        return self.TriggerPosition
+
+    def GetDataQuery(self, Channel = 1, TriggerPosition = None):
+        Source = 'ACQ:SOUR%d:DATA' % Channel
+        Length = self.GetWindowLength()
+
+        if (self.WindowMode == 'FULL'):
+            return Source + '?'
+        if (self.WindowMode == 'OLDEST'):
+            return Source + ':OLD:N? %d' % Length
+        if (self.WindowMode == 'LATEST'):
+            return Source + ':LAT:N? %d' % Length
+
+        if TriggerPosition is None:
+            TriggerPosition = self.GetTriggerPosition()
+
+        # The full buffer starts GetTriggerIndex() samples before the trigger
+        Position = (TriggerPosition - self.GetTriggerIndex() + self.GetWindowStart()) % self.NrSamples
+        return Source + ':STA:N? %d,%d' % (Position, Length)
+
+    #==============================================================================
+    # Format = {ASCII, BIN}, Units = {VOLTS, RAW}
+    #==============================================================================
+    def SetDataFormat(self, Format = 'ASCII', Units = 'VOLTS'):
+        self.DataFormat = Format
+        self.DataUnits = Units
+        self.WriteDataFormat()
+        return
+
+    def WriteDataFormat(self):
+        with self.rp.batch():
+            self.rp.tx_set('ACQ:DATA:FORMAT', self.DataFormat)
+            self.rp.tx_set('ACQ:DATA:UNITS', self.DataUnits)
+        return
         
     #==============================================================================
     # Nov-2021: Not all decimations do work in the stable release of the red pitaya. 
@@ -120,8 +431,125 @@ class redpitaya_scope:
         return
 
     def WriteDecimation(self):
-        self.rp.tx_txt('ACQ:DEC ' + str(self.Decimation) )
+        self.rp.tx_set('ACQ:DEC', self.Decimation)
         return
+
+    #==============================================================================
+    # Pick the decimation for a frequency band:
+    # - the buffer holds at least Periods periods of FrequencyMin
+    # - the sample frequency is at least Oversampling * FrequencyMax
+    # The smallest decimation with the duration is used (highest Nyquist).
+    # When both do not fit in NrSamples, FrequencyMax wins and a warning is
+    # printed. Stable = True only uses Decimation_Array (stable release).
+    # Returns the resulting settings, see GetTimebase.
+    #==============================================================================
+    def ConfigureFor(self, FrequencyMin, FrequencyMax, Periods = 3, Oversampling = 10, Stable = False):
+        Index = self.GetDecimationIndexFor(FrequencyMin, FrequencyMax, Periods, Oversampling, Stable)
+        return self.SetDecimationIndex(Index, Stable)
+
+    def GetDecimationIndexFor(self, FrequencyMin, FrequencyMax, Periods = 3, Oversampling = 10, Stable = False, Verbose = True):
+        Decimations = self.Decimation_Array if Stable else self.Decimation_Array_Beta
+
+        Duration  = Decimations * self.NrSamples / self.SampleFrequency
+        Frequency = self.SampleFrequency / Decimations
+
+        Fits  = Duration >= Periods / FrequencyMin
+        Fast  = Frequency >= Oversampling * FrequencyMax
+
+        if np.any(Fits & Fast):
+            Index = np.nonzero(Fits & Fast)[0][0]
+        elif np.any(Fast):
+            Index = np.nonzero(Fast)[0][-1]
+            if Verbose:
+                print("Warning: %.1f Hz - %.1f Hz does not fit in one buffer, lowest frequency %.1f Hz" %
+                      (FrequencyMin, FrequencyMax, Periods / Duration[Index]))
+        else:
+            Index = 0
+            if Verbose:
+                print("Warning: %.1f Hz is above the Nyquist frequency / %.0f" % (FrequencyMax, Oversampling / 2))
+
+        return Index
+
+    #==============================================================================
+    # Smallest decimation with a buffer of at least Duration seconds.
+    #==============================================================================
+    def ConfigureForDuration(self, Duration, Stable = False):
+        Decimations = self.Decimation_Array if Stable else self.Decimation_Array_Beta
+
+        Fits = Decimations * self.NrSamples / self.SampleFrequency >= Duration
+        if np.any(Fits):
+            Index = np.nonzero(Fits)[0][0]
+        else:
+            Index = len(Decimations) - 1
+            print("Warning: %.3f sec is longer than the longest buffer" % Duration)
+
+        return self.SetDecimationIndex(Index, Stable)
+
+    def SetDecimationIndex(self, Index, Stable = False):
+        if Stable:
+            self.SetDecimation(Index)
+        else:
+            self.SetDecimationBeta(Index)
+
+        Timebase = self.GetTimebase()
+        print("Decimation      : %d" % Timebase['Decimation'])
+        print("Sample frequency: %.3f kHz" % (Timebase['Frequency'] / 1e3))
+        print("Nyquist         : %.3f kHz" % (Timebase['Nyquist'] / 1e3))
+        print("Resolution      : %.3f Hz" % Timebase['Resolution'])
+        print("Duration        : %.3f msec" % (Timebase['Duration'] * 1e3))
+        return Timebase
+
+    def GetTimebase(self):
+        Timebase = {
+            'Decimation' : int(self.Decimation),
+            'Frequency'  : self.Frequency,
+            'Nyquist'    : self.Frequency / 2,
+            'Resolution' : self.Frequency / self.NrSamples,
+            'Duration'   : self.Duration,
+        }
+        return Timebase
+
+    #==============================================================================
+    # Pre-scan for the input range: a short capture (Length samples, trigger
+    # NOW) in HV, LV is used when the peak fits in Margin of the LV range.
+    # Call it after the decimation is set, the capture should hold a period.
+    # Returns the gains, e.g. ['LV', 'HV'].
+    #==============================================================================
+    def AutoGain(self, Length = 2048, Margin = 0.9, Timeout = 5.0):
+        Saved = self.PrepareAutoGain(Length)
+
+        self.Start()
+        self.WaitForTrigger(Timeout)
+        Data = self.GetDataBoth()
+
+        return self.FinishAutoGain(Data, Saved, Margin)
+
+    # HV, trigger NOW and a window of Length samples, returns the settings to restore
+    def PrepareAutoGain(self, Length = 2048):
+        Saved = (getattr(self, 'TriggerConf', 'DISABLED'), getattr(self, 'TriggerLevel', 0),
+                 self.TriggerDelay, self.WindowMode, self.WindowLength, self.WindowStart, self.WindowPreTrigger)
+
+        self.SetInputGain(Channel = 1, Gain = 'HV')
+        self.SetInputGain(Channel = 2, Gain = 'HV')
+        self.SetWindow(Mode = 'OLDEST', Length = Length)
+        self.TriggerConf, self.TriggerLevel, self.TriggerDelay = 'NOW', 0, 8192
+        return Saved
+
+    # Select the gains from the pre-scan Data and restore the settings
+    def FinishAutoGain(self, Data, Saved, Margin = 0.9):
+        # Volt at the input connector (without probe)
+        Peak  = np.max(np.abs(Data), axis=1) / self.Probe
+        Gains = ['LV' if (p < Margin) else 'HV' for p in Peak]
+
+        self.SetInputGain(Channel = 1, Gain = Gains[0])
+        self.SetInputGain(Channel = 2, Gain = Gains[1])
+
+        # The trigger is written again by Start
+        (self.TriggerConf, self.TriggerLevel, self.TriggerDelay, self.WindowMode,
+         self.WindowLength, self.WindowStart, self.WindowPreTrigger) = Saved
+
+        print("Input peak      : %.3f V, %.3f V -> %s, %s" % (Peak[0], Peak[1], Gains[0], Gains[1]))
+        return Gains
     
     #==============================================================================
     # Options are: 
@@ -140,9 +568,10 @@ class redpitaya_scope:
         return
     
     def WriteTrigger(self):
-        self.rp.tx_txt('ACQ:TRIG ' + self.TriggerConf )        
-        self.rp.tx_txt('ACQ:TRIG:DLY ' + str(self.TriggerDelay) )
-        self.rp.tx_txt('ACQ:TRIG:LEV ' + str(self.TriggerLevel) )
+        with self.rp.batch():
+            self.rp.tx_txt('ACQ:TRIG ' + self.TriggerConf )        
+            self.rp.tx_set('ACQ:TRIG:DLY', self.TriggerDelay)
+            self.rp.tx_set('ACQ:TRIG:LEV', self.TriggerLevel)
         return
     
     #==============================================================================
@@ -155,7 +584,7 @@ class redpitaya_scope:
         return
     
     def WriteAverage(self):
-        self.rp.tx_txt('ACQ:AVG ' + str(self.Average))        
+        self.rp.tx_set('ACQ:AVG', self.Average)
         return
 
 
@@ -185,8 +614,32 @@ class redpitaya_scope:
         print("Probe 2         : %.0fx" % self.Probe[1])
         return;
 
+    #==============================================================================
+    # Scope settings as plain python types (json/metadata of stored captures).
+    #==============================================================================
+    def GetSettings(self):
+        Settings = {
+            'Decimation'      : int(self.Decimation),
+            'Frequency'       : float(self.Frequency),
+            'NrSamples'       : int(self.NrSamples),
+            'Duration'        : float(self.Duration),
+            'Trigger'         : getattr(self, 'TriggerConf', None),
+            'TriggerLevel'    : float(getattr(self, 'TriggerLevel', 0)),
+            'TriggerDelay'    : int(self.TriggerDelay),
+            'Average'         : int(self.Average),
+            'Gain'            : [int(g) for g in self.Gain],
+            'Probe'           : [float(p) for p in self.Probe],
+            'DataFormat'      : self.DataFormat,
+            'DataUnits'       : self.DataUnits,
+            'WindowMode'      : self.WindowMode,
+            'WindowStart'     : int(self.GetWindowStart()),
+            'WindowLength'    : int(self.GetWindowLength()),
+        }
+        return Settings
+
     def GetTimeVector(self):
-        TimeVector = np.arange(self.NrSamples) / self.Frequency
+        Start = self.GetWindowStart()
+        TimeVector = np.arange(Start, Start + self.GetWindowLength()) / self.Frequency
         return TimeVector
     
     def GetDuration(self):
@@ -216,18 +669,18 @@ class redpitaya_scope:
         if (Channel == 1):
             if 'LV' in Gain:
                 self.Gain[0] = 1
-                self.rp.tx_txt('ACQ:SOUR1:GAIN LV')
+                self.rp.tx_set('ACQ:SOUR1:GAIN', 'LV')
             else:
                 self.Gain[0] = 10
-                self.rp.tx_txt('ACQ:SOUR1:GAIN HV')
+                self.rp.tx_set('ACQ:SOUR1:GAIN', 'HV')
 
         if (Channel == 2):
             if 'LV' in Gain:
                 self.Gain[1] = 1
-                self.rp.tx_txt('ACQ:SOUR2:GAIN LV')
+                self.rp.tx_set('ACQ:SOUR2:GAIN', 'LV')
             else:
                 self.Gain[1] = 10
-                self.rp.tx_txt('ACQ:SOUR2:GAIN HV')
+                self.rp.tx_set('ACQ:SOUR2:GAIN', 'HV')
         return
     
     def SetProbeGain(self, Probe=1, Gain=1):
@@ -274,6 +727,11 @@ class redpitaya_generator:
 
     def __init__(self, pitaya):
         self.rp = pitaya
+
+        # Per object copies, the class arrays would be shared by all boards.
+        self.GenSignalType = self.GenSignalType.copy()
+        self.Amplitude     = self.Amplitude.copy()
+        self.Frequency     = self.Frequency.copy()
         return
 
     #==============================================================================
@@ -298,132 +756,133 @@ class redpitaya_generator:
         
     #==============================================================================
     # Noise wave (ARBITRARY)
+    # Uniform white noise between -1 and 1, Seed for a repeatable buffer.
     #==============================================================================
-    def Noise(self, Channel = 1, Amplitude = 1.0, Frequency = 100.0):
+    def Noise(self, Channel = 1, Amplitude = 1.0, Frequency = 100.0, Seed = None):
 
         # Frequency for the entire buffer.
-        self.GenSignalType[Channel - 1] = 6
-        self.Amplitude[Channel - 1] = Amplitude
-        self.Frequency[Channel - 1] = Frequency
-        
-        BUFF_SIZE = 16384
-        z = ''
-        
-        for i in range(0, BUFF_SIZE-2):
-            z += str(2.0 * random.random() - 1.0) + ', '
+        Samples = np.random.default_rng(Seed).uniform(-1.0, 1.0, self.NrSamples)
+        self.Arbitrary(Channel, Samples, Amplitude, Frequency)
+        return    
+    
+    #==============================================================================
+    # Complex demo wave (ARBITRARY)
+    # Channel 1: sin(t) + 1/3 + sin(3t), channel 2: sin(t)/2 + sin(4t)/4
+    # Samples where channel 1 would clip are -1 on both channels.
+    #==============================================================================
+    def ComplexDemo(self, Channel = 1, Amplitude = 1.0, Frequency = 100.0):
 
-        z += str(2.0 * random.random() - 1.0)
+        # Frequency for the entire buffer.
+        t = (2 * np.pi) / self.NrSamples * np.arange(self.NrSamples)
 
-        # last sample without "," after it.
-        if (Channel == 1):
-            self.rp.tx_txt('SOUR1:TRAC:DATA:DATA ' + z)
+        x = np.sin(t) + (1.0/3.0) + np.sin(t * 3)
+        y = (1.0 / 2.0) * np.sin(t) + (1.0/4.0) * np.sin(t * 4)
 
-        if (Channel == 2):
-            self.rp.tx_txt('SOUR2:TRAC:DATA:DATA ' + z)
-        
-        self.ConfigureSignalGen(Channel)
+        Clip = (x <= -1) | (x >= 1)
+        x[Clip] = -1.0
+        y[Clip] = -1.0
 
+        if (Channel == 1):
+            self.Arbitrary(Channel, x, Amplitude, Frequency)
+        else:
+            self.Arbitrary(Channel, y, Amplitude, Frequency)
         return    
-    
+
     #==============================================================================
-    # Noise wave (ARBITRARY)
+    # Arbitrary wave from a NumPy array.
+    # Samples are clipped to +/-1, at most NrSamples (16384) samples, NaN and
+    # inf are refused. Frequency is the repetition frequency of the entire buffer.
     #==============================================================================
-    def ComplexDemo(self, Channel = 1, Amplitude = 1.0, Frequency = 100.0):
+    def Arbitrary(self, Channel, Samples, Amplitude = 1.0, Frequency = 100.0):
+        Samples = np.asarray(Samples, dtype=float).ravel()
+
+        if (np.size(Samples) == 0) or (np.size(Samples) > self.NrSamples):
+            raise ValueError('Generator >> arbitrary wave needs 1 to %d samples, got %d' % (self.NrSamples, np.size(Samples)))
+
+        if not np.isfinite(Samples).all():
+            raise ValueError('Generator >> arbitrary wave contains NaN or inf')
+
+        Samples = np.clip(Samples, -1.0, 1.0)
 
-        # Frequency for the entire buffer.
         self.GenSignalType[Channel - 1] = 6
         self.Amplitude[Channel - 1] = Amplitude
         self.Frequency[Channel - 1] = Frequency
-        
-        BUFF_SIZE = 16384
-        
-        y = ''
-        x = ''
-        t = []
-        
-        for i in range(0, BUFF_SIZE):
-            t.append((2 * math.pi) / BUFF_SIZE * i)
-        
-        for i in range(0, BUFF_SIZE-1):
-            if(i != BUFF_SIZE-2):
-                b = math.sin(t[i]) + (1.0/3.0) + math.sin(t[i] * 3)
-    
-                if(b <= -1 or b >= 1):
-                    x += str(-1.0) + ', '
-                    y += str(-1.0) + ', '
-                else:
-                    x += str(math.sin(t[i]) + (1.0/3.0) + math.sin(t[i] * 3)) + ', '
-                    y += str((1.0 / 2.0) * math.sin(t[i]) + (1.0/4.0) * math.sin(t[i] * 4)) + ', '
-                    
-            else:
-                c = math.sin(t[i]) + (1.0/3.0) + math.sin(t[i] * 3)
-                if(c <= -1 or c >= 1):
-                    x += str(-1.0)
-                    y += str(-1.0)
-                else:
-                    x += str(math.sin(t[i]) + (1.0/3.0) + math.sin(t[i] * 3))
-                    y += str((1.0 / 2.0) * math.sin(t[i]) + (1.0/4.0) * math.sin(t[i] * 4))
-                
 
-        # last sample without "," after it.
-        if (Channel == 1):
-            self.rp.tx_txt('SOUR1:TRAC:DATA:DATA ' + x)
+        with self.rp.batch():
+            self.WriteArbitrary(Channel, Samples)
+            self.ConfigureSignalGen(Channel)
+        return
 
-        if (Channel == 2):
-            self.rp.tx_txt('SOUR2:TRAC:DATA:DATA ' + y)
-        
-        self.ConfigureSignalGen(Channel)
+    #==============================================================================
+    # The firmware only accepts the waveform as ASCII. 5 decimals is more than
+    # the 14 bit DAC resolution and keeps the upload at about 8 bytes/sample.
+    # The scpi object remembers the hash of the buffer each channel holds,
+    # uploading the same buffer again is skipped.
+    #==============================================================================
+    def WriteArbitrary(self, Channel, Samples):
+        Hash = self.GetWaveformHash(Samples)
+        Cmd  = 'SOUR%d:TRAC:DATA:DATA' % Channel
 
-        return    
-    
+        if self.rp.is_set(Cmd, Hash):
+            return
+
+        Data = ','.join(['%.5f'] * np.size(Samples)) % tuple(Samples.tolist())
+        self.rp.tx_txt(Cmd + ' ' + Data)
+        self.rp.mark_set(Cmd, Hash)
+        return
+
+    def GetWaveformHash(self, Samples):
+        return hashlib.sha1(np.ascontiguousarray(Samples, dtype=float).tobytes()).hexdigest()
 
     def ConfigureSignalGen(self, Channel = 1):
-        #sine
-        if (self.GenSignalType[Channel -1] == 0):
-            if (Channel == 1):
-                self.rp.tx_txt('SOUR1:FUNC SINE')       
+        with self.rp.batch():
+            #sine
+            if (self.GenSignalType[Channel -1] == 0):
+                if (Channel == 1):
+                    self.rp.tx_set('SOUR1:FUNC', 'SINE')       
     
-            if (Channel == 2):
-                self.rp.tx_txt('SOUR2:FUNC SINE')        
+                if (Channel == 2):
+                    self.rp.tx_set('SOUR2:FUNC', 'SINE')        
             
-        # square
-        if (self.GenSignalType[Channel -1] == 1):
-            if (Channel == 1):
-                self.rp.tx_txt('SOUR1:FUNC SQUARE')       
+            # square
+            if (self.GenSignalType[Channel -1] == 1):
+                if (Channel == 1):
+                    self.rp.tx_set('SOUR1:FUNC', 'SQUARE')       
     
-            if (Channel == 2):
-                self.rp.tx_txt('SOUR2:FUNC SQUARE')    
+                if (Channel == 2):
+                    self.rp.tx_set('SOUR2:FUNC', 'SQUARE')    
                 
-        # ARBITRARY
-        if (self.GenSignalType[Channel -1] == 6):
-            if (Channel == 1):
-                self.rp.tx_txt('SOUR1:FUNC ARBITRARY')       
+            # ARBITRARY
+            if (self.GenSignalType[Channel -1] == 6):
+                if (Channel == 1):
+                    self.rp.tx_set('SOUR1:FUNC', 'ARBITRARY')       
     
-            if (Channel == 2):
-                self.rp.tx_txt('SOUR2:FUNC ARBITRARY')    
+                if (Channel == 2):
+                    self.rp.tx_set('SOUR2:FUNC', 'ARBITRARY')    
                 
-        # Set configuration for all wave forms configuration
-        if (Channel == 1):
-            Ampl = ("%.3f" % self.Amplitude[0])
-            self.rp.tx_txt('SOUR1:VOLT ' + str(Ampl))
-            self.rp.tx_txt('SOUR1:FREQ:FIX ' + str(self.Frequency[0]))        
+            # Set configuration for all wave forms configuration
+            if (Channel == 1):
+                Ampl = ("%.3f" % self.Amplitude[0])
+                self.rp.tx_set('SOUR1:VOLT', Ampl)
+                self.rp.tx_set('SOUR1:FREQ:FIX', self.Frequency[0])
 
-        if (Channel == 2):
-            Ampl = ("%.3f" % self.Amplitude[1])
-            self.rp.tx_txt('SOUR2:VOLT ' + str(Ampl))
-            self.rp.tx_txt('SOUR2:FREQ:FIX ' + str(self.Frequency[1]))        
+            if (Channel == 2):
+                Ampl = ("%.3f" % self.Amplitude[1])
+                self.rp.tx_set('SOUR2:VOLT', Ampl)
+                self.rp.tx_set('SOUR2:FREQ:FIX', self.Frequency[1])
             
         return
 
     def EnableOutput(self, Channel = 1):
         if (Channel == 1):
-            self.rp.tx_txt('OUTPUT1:STATE ON')
+            self.rp.tx_set('OUTPUT1:STATE', 'ON')
         if (Channel == 2):
-            self.rp.tx_txt('OUTPUT2:STATE ON')
+            self.rp.tx_set('OUTPUT2:STATE', 'ON')
         return
         
     def EnableBothOutputs(self):
         self.rp.tx_txt('OUTPUT:STATE ON')
+        self.rp.invalidate('OUTPUT')
         return
     
     def PrintSettings_Sine(self):
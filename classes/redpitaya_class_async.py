@@ -0,0 +1,214 @@
+import asyncio
+import time
+import numpy as np
+from redpitaya_class import redpitaya_scope, redpitaya_generator, TriggerTimeout
+
+#==============================================================================
+# Asyncio versions of the scope and generator classes.
+# Use them with redpitaya_scpi_async.AsyncScpi to control many boards from
+# one process. All setters are inherited and only queue commands, the methods
+# that wait for the board are coroutines.
+#
+# async def capture(ip):
+#     async with AsyncScpi(ip) as Pitaya:
+#         Scope = redpitaya_scope_async(Pitaya)
+#         Scope.SetDecimationBeta(6)
+#         Scope.SetTrigger(Trigger = "NOW")
+#         Scope.Start()
+#         await Scope.WaitForTrigger()
+#         return await Scope.GetData_Bin(Channel = 1)
+#
+# Data = await asyncio.gather(*[capture(ip) for ip in ips])
+#==============================================================================
+
+#==============================================================================
+# Scope class
+#==============================================================================
+class redpitaya_scope_async(redpitaya_scope):
+
+    async def Drain(self):
+        await self.rp.drain()
+        return
+
+    async def WaitForTrigger(self, Timeout = None):
+        Start    = time.perf_counter()
+        Interval = self.PollInterval
+
+        while 1:
+            Now    = time.time()
+            answer = await self.rp.txrx_txt('ACQ:TRIG:STAT?')
+
+            if 'TD' in answer:
+                self.TriggerTime = Now
+                break
+
+            if (Timeout is not None) and (time.perf_counter() - Start > Timeout):
+                raise TriggerTimeout('Scope >> no trigger within %.3f sec' % Timeout)
+
+            await asyncio.sleep(Interval)
+            Interval = min(2 * Interval, self.PollIntervalMax)
+
+        # make sure the data is ready
+        await self.WaitForFill(Timeout)
+        self.rp.tx_txt('DIG:PIN LED0, 0')
+        return
+
+    async def WaitForFill(self, Timeout = None):
+        FillTime = self.GetPostTriggerTime()
+
+        if not self.UseTriggerFill:
+            await asyncio.sleep(FillTime)
+            return
+
+        Start    = time.perf_counter()
+        Interval = max(self.PollInterval, FillTime / 4)
+
+        while 1:
+            answer = await self.rp.txrx_txt('ACQ:TRIG:FILL?')
+
+            if '1' in answer:
+                break
+
+            if (Timeout is not None) and (time.perf_counter() - Start > Timeout):
+                raise TriggerTimeout('Scope >> buffer not filled within %.3f sec' % Timeout)
+
+            await asyncio.sleep(Interval)
+            Interval = min(2 * Interval, self.PollIntervalMax)
+        return
+
+    async def WaitForPreTrigger(self, Delay = None):
+        await asyncio.sleep(self.GetPreTriggerTime(Delay))
+        return
+
+    # The synchronous version would need an answer of the board
+    def GetTriggerPosition(self):
+        if self.TriggerPosition is None:
+            raise TypeError('Scope >> use await GetTriggerPositionAsync() with the async scope')
+        return self.TriggerPosition
+
+    # Trigger position for window reads (see SetWindow), None when not needed
+    async def GetTriggerPositionAsync(self):
+        if not self.NeedsTriggerPosition():
+            return None
+        if self.TriggerPosition is None:
+            self.TriggerPosition = int(await self.rp.txrx_txt('ACQ:TPOS?'))
+        return self.TriggerPosition
+
+    async def GetData_Txt(self, Channel = 1):
+        if (self.DataFormat != 'ASCII'):
+            self.SetDataFormat('ASCII', self.DataUnits)
+
+        self.rp.tx_txt(self.GetDataQuery(Channel, await self.GetTriggerPositionAsync()))
+
+        buff_string = await self.rp.rx_bytes()
+        buff_string = buff_string.strip(b'{}\n\r')
+        return np.fromstring(buff_string, sep=',')
+
+    async def GetData_Bin(self, Channel = 1, Units = 'VOLTS'):
+        if (self.DataFormat != 'BIN') or (self.DataUnits != Units):
+            self.SetDataFormat('BIN', Units)
+
+        self.rp.tx_txt(self.GetDataQuery(Channel, await self.GetTriggerPositionAsync()))
+
+        if (Units == 'RAW'):
+            return (await self.rp.rx_bin('>i2')).astype(np.int16)
+
+        return (await self.rp.rx_bin('>f4')).astype(np.float32)
+
+    async def GetDataBoth(self, Out = None):
+        if (self.DataFormat != 'BIN') or (self.DataUnits != 'VOLTS'):
+            self.SetDataFormat('BIN', 'VOLTS')
+
+        if Out is None:
+            Out = np.empty((2, self.GetWindowLength()), dtype=np.float32)
+
+        TriggerPosition = await self.GetTriggerPositionAsync()
+
+        with self.rp.batch():
+            self.rp.tx_txt(self.GetDataQuery(1, TriggerPosition))
+            self.rp.tx_txt(self.GetDataQuery(2, TriggerPosition))
+
+        Out[0] = await self.rp.rx_bin('>f4')
+        Out[1] = await self.rp.rx_bin('>f4')
+
+        Out[0] *= self.GetGain(1)
+        Out[1] *= self.GetGain(2)
+        return Out
+
+    # Input range pre-scan, see redpitaya_scope.AutoGain
+    async def AutoGain(self, Length = 2048, Margin = 0.9, Timeout = 5.0):
+        Saved = self.PrepareAutoGain(Length)
+
+        self.Start()
+        await self.WaitForTrigger(Timeout)
+        Data = await self.GetDataBoth()
+
+        return self.FinishAutoGain(Data, Saved, Margin)
+
+    #==============================================================================
+    # Burst capture, see redpitaya_scope.CaptureBurst
+    #==============================================================================
+    async def CaptureBurst(self, K, Out = None, Timeout = None):
+        if (self.DataFormat != 'BIN') or (self.DataUnits != 'VOLTS'):
+            self.SetDataFormat('BIN', 'VOLTS')
+
+        if Out is None:
+            Out = np.empty((K, 2, self.GetWindowLength()), dtype=np.float32)
+
+        Timestamps  = np.empty(K)
+        PreTrigger  = self.GetPreTriggerTime()
+
+        await self.Arm(PreTrigger)
+
+        for k in range(K):
+            await self.WaitForTrigger(Timeout)
+            Timestamps[k] = self.TriggerTime
+
+            TriggerPosition = await self.GetTriggerPositionAsync()
+            self.TriggerPosition = None
+
+            with self.rp.batch():
+                self.rp.tx_txt(self.GetDataQuery(1, TriggerPosition))
+                self.rp.tx_txt(self.GetDataQuery(2, TriggerPosition))
+
+                if (k < K - 1):
+                    self.rp.tx_txt('ACQ:START')
+                    if (PreTrigger == 0):
+                        self.WriteTrigger()
+
+            Armed = time.perf_counter()
+            Out[k, 0] = await self.rp.rx_bin('>f4')
+            Out[k, 1] = await self.rp.rx_bin('>f4')
+
+            if (k < K - 1) and (PreTrigger > 0):
+                await asyncio.sleep(max(0.0, PreTrigger - (time.perf_counter() - Armed)))
+                self.WriteTrigger()
+
+        Out[:, 0] *= self.GetGain(1)
+        Out[:, 1] *= self.GetGain(2)
+        return Out, Timestamps
+
+    async def Arm(self, PreTrigger = 0):
+        self.TriggerPosition = None
+
+        with self.rp.batch():
+            self.WriteDataFormat()
+            self.WriteDecimation()
+            self.rp.tx_txt('ACQ:START')
+            if (PreTrigger == 0):
+                self.WriteTrigger()
+
+        if (PreTrigger > 0):
+            await asyncio.sleep(PreTrigger)
+            self.WriteTrigger()
+        return
+
+
+#==============================================================================
+# Signal generator class
+#==============================================================================
+class redpitaya_generator_async(redpitaya_generator):
+
+    async def Drain(self):
+        await self.rp.drain()
+        return
@@ -0,0 +1,132 @@
+import time
+import numpy as np
+
+#==============================================================================
+# Live view for the scope scripts.
+# Blitting: the figure (axes, ticks, legend, grid) is drawn once and saved,
+# an update restores that background and only draws the lines again.
+# The lines are reduced to a min/max pair per pixel column, the drawing time
+# does not depend on the number of samples. Updates faster than MaxFrameRate
+# are skipped (the acquisition does not wait for the plot).
+#
+# LiveView = redpitaya_liveview(fig, ax1, [line1, line2])
+# while True:
+#     ... capture Data1, Data2
+#     LiveView.Update([Data1, Data2])
+# LiveView.Stop()
+# plt.show()
+#==============================================================================
+class redpitaya_liveview:
+
+    def __init__(self, fig, ax, lines, MaxFrameRate = 25.0):
+        self.fig          = fig
+        self.ax           = ax
+        self.lines        = lines
+        self.MaxFrameRate = MaxFrameRate
+        self.Background   = None
+        self.LastFrame    = 0.0
+        self.NrFrames     = 0
+        self.NrSkipped    = 0
+
+        # Full resolution data, the lines only get the decimated version
+        self.X = [np.asarray(line.get_xdata(), dtype=float) for line in lines]
+        self.Y = [np.asarray(line.get_ydata(), dtype=float).ravel() for line in lines]
+
+        for line in self.lines:
+            line.set_animated(True)
+
+        # A resize or full draw renders the figure, save the new background
+        self.cid = self.fig.canvas.mpl_connect('draw_event', self.OnDraw)
+        self.fig.canvas.draw()
+        return
+
+    def OnDraw(self, event = None):
+        # Backends without blitting (e.g. inline) are redrawn completely
+        if not getattr(self.fig.canvas, 'supports_blit', False):
+            return
+
+        self.Background = self.fig.canvas.copy_from_bbox(self.fig.bbox)
+        self.DrawLines()
+        return
+
+    def DrawLines(self):
+        for line in self.lines:
+            self.ax.draw_artist(line)
+        return
+
+    def GetPixelWidth(self):
+        return max(1, int(self.ax.get_window_extent().width))
+
+    #==============================================================================
+    # Data: one y array per line, x is only needed when it changes.
+    # Returns True when a frame was drawn.
+    #==============================================================================
+    def Update(self, Data, X = None, Force = False):
+        for i, y in enumerate(Data):
+            self.Y[i] = np.asarray(y, dtype=float).ravel()
+            if X is not None:
+                self.X[i] = np.asarray(X[i], dtype=float)
+
+        Now = time.perf_counter()
+        if (not Force) and (Now - self.LastFrame < 1.0 / self.MaxFrameRate):
+            self.NrSkipped += 1
+            return False
+
+        self.LastFrame = Now
+        self.NrFrames += 1
+
+        Width = self.GetPixelWidth()
+        for line, x, y in zip(self.lines, self.X, self.Y):
+            line.set_data(*MinMaxDecimate(x, y, Width))
+
+        if self.Background is None:
+            self.fig.canvas.draw()
+        else:
+            self.fig.canvas.restore_region(self.Background)
+            self.DrawLines()
+            self.fig.canvas.blit(self.fig.bbox)
+
+        self.fig.canvas.flush_events()
+        return True
+
+    #==============================================================================
+    # Back to a normal figure with the full resolution data (for zoom, cursors).
+    #==============================================================================
+    def Stop(self):
+        self.fig.canvas.mpl_disconnect(self.cid)
+
+        for line, x, y in zip(self.lines, self.X, self.Y):
+            line.set_animated(False)
+            line.set_data(x, y)
+
+        self.fig.canvas.draw_idle()
+        return
+
+
+#==============================================================================
+# Reduce y to the minimum and maximum per bin, Width bins. The two points of
+# a bin are kept in their original order, so the envelope of the signal
+# (spikes included) is drawn exactly as with all samples.
+#==============================================================================
+def MinMaxDecimate(x, y, Width):
+    N = len(y)
+    Bin = N // max(1, Width)
+
+    if (Bin < 2):
+        return x, y
+
+    M  = Bin * (N // Bin)
+    yr = y[:M].reshape(-1, Bin)
+
+    i_min = np.argmin(yr, axis=1)
+    i_max = np.argmax(yr, axis=1)
+
+    Index = np.empty((yr.shape[0], 2), dtype=np.intp)
+    Index[:, 0] = np.minimum(i_min, i_max)
+    Index[:, 1] = np.maximum(i_min, i_max)
+    Index += (np.arange(yr.shape[0]) * Bin)[:, None]
+    Index = Index.ravel()
+
+    # Samples that do not fill a bin are kept
+    Index = np.concatenate((Index, np.arange(M, N)))
+    return x[Index], y[Index]
@@ -3,6 +3,7 @@
 import socket
 import struct
 import codecs
+import contextlib
 import numpy as np
 
 __author__ = "Luka Golinar, Iztok Jeras"
@@ -20,8 +21,18 @@ class scpi (object):
         self.port    = port
         self.timeout = timeout
 
+        # Bytes received after the last delimiter, kept for the next reply.
+        self._rxbuf  = bytearray()
+
+        # Commands queued by batch(), None when not batching.
+        self._batch  = None
+
+        # Last value send per setting, see tx_set.
+        self._shadow = {}
+
         try:
             self._socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+            self._socket.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
 
             if timeout is not None:
                 self._socket.settimeout(timeout)
@@ -42,13 +53,33 @@ class scpi (object):
 
     def rx_txt(self, chunksize = 4096):
         """Receive text string and return it after removing the delimiter."""
-        msg = ''
+        return self.rx_bytes(chunksize).decode('utf-8')
+
+    def rx_bytes(self, chunksize = 4096):
+        """Receive a reply and return it as bytes after removing the delimiter.
+        The reply is accumulated in one bytearray and only the newly received
+        bytes (plus a possibly split delimiter) are searched for the delimiter.
+        """
+        if self._batch:
+            self.flush()
+
+        delimiter = self.delimiter.encode('utf-8')
+        buf = self._rxbuf
+        chunk = memoryview(bytearray(chunksize)) # Receive chunk size of 2^n preferably
+        start = 0
         while 1:
-            chunk = self._socket.recv(chunksize + len(self.delimiter)).decode('utf-8') # Receive chunk size of 2^n preferably
-            msg += chunk
-            if (len(chunk) and chunk[-2:] == self.delimiter):
+            end = buf.find(delimiter, start)
+            if (end >= 0):
                 break
-        return msg[:-2]
+            start = max(0, len(buf) - len(delimiter) + 1)
+            size = self._socket.recv_into(chunk)
+            if size == 0:
+                raise ConnectionError('SCPI >> connection closed while waiting for a reply')
+            buf += chunk[:size]
+
+        msg = bytes(buf[:end])
+        del buf[:end + len(delimiter)]
+        return msg
 
     # def rx_arb(self):
     #     numOfBytes = 0
@@ -88,32 +119,69 @@ class scpi (object):
     #     return str
     
     
-    def rx_bin(self):
+    def rx_exact(self, nbytes):
+        """Receive exactly nbytes and return them as bytes."""
+        buf = bytearray(nbytes)
+        self.rx_into(memoryview(buf))
+        return bytes(buf)
+
+    def rx_into(self, view):
+        """Fill the writable buffer view completely from the socket."""
+        if self._batch:
+            self.flush()
+
+        view = memoryview(view).cast('B')
+
+        # Use what is left over from a previous reply first.
+        received = min(len(self._rxbuf), len(view))
+        view[:received] = self._rxbuf[:received]
+        del self._rxbuf[:received]
+
+        while received < len(view):
+            size = self._socket.recv_into(view[received:])
+            if size == 0:
+                raise ConnectionError('SCPI >> connection closed during binary transfer')
+            received += size
+        return received
+
+    def rx_bin(self, dtype='>f4', out=None):
+        """Receive an IEEE 488.2 definite length binary block.
+        The block looks like #<n><length><data> where <n> is the number of
+        digits of <length>. The data is returned as a NumPy array of dtype,
+        Red Pitaya sends the samples in network (big-endian) byte order.
+        With out (a contiguous array with items of the same size, e.g. a row
+        of a float32 array) the data is received directly into out and
+        converted to the byte order of out in place.
+        """
         # The first thing it sends is always a #
-        #
-        buf = self._socket.recv(1)
-        print(buf.decode('utf-8'))
+        header = self.rx_exact(2)
+        if header[0:1] != b'#':
+            raise ValueError('SCPI >> binary block expected, got {!r}'.format(header))
 
-        # The second thing it sends is the number of digits in the byte count. 
-        buf = self._socket.recv(1)
-        digits_in_byte_count = int(buf)
-        print(digits_in_byte_count)
+        # The second thing it sends is the number of digits in the byte count.
+        digits_in_byte_count = int(header[1:2])
+        if digits_in_byte_count == 0:
+            raise ValueError('SCPI >> indefinite length binary blocks are not supported')
 
         # The third thing it sends is the byte count
-        # buf = self._socket.recv(digits_in_byte_count)
-        buf = self._socket.recv(5)
-        print(buf.decode('utf-8'))
-        byte_count = int(buf)
+        byte_count = int(self.rx_exact(digits_in_byte_count))
 
-        # buf = []
-        # while len(buf) != byte_count:
-        #     buf.append(self._socket.recv(1))
+        dtype = np.dtype(dtype)
+        count = byte_count // dtype.itemsize
 
-        # buffer_size = int(byte_count / 4)
-        # 16384
-        # 16384
-        result = np.empty(16384, dtype = np.int16)
-        size = self._socket.recv_into(result)
+        if out is None:
+            result = np.empty(count, dtype=dtype)
+            self.rx_into(result)
+        else:
+            if (out.dtype.itemsize != dtype.itemsize) or (count > out.size):
+                raise ValueError('SCPI >> {} items of {} do not fit in out'.format(count, dtype))
+            result = out[:count]
+            self.rx_into(result.view(dtype))
+            if result.dtype.isnative != dtype.isnative:
+                result.byteswap(inplace=True)
+
+        # Skip any trailing odd bytes and the delimiter closing the reply.
+        self.rx_exact(byte_count - result.nbytes + len(self.delimiter))
 
         return result
 
@@ -128,11 +196,112 @@ class scpi (object):
         
 
     def tx_txt(self, msg):
-        """Send text string ending and append delimiter."""
-        return self._socket.send((msg + self.delimiter).encode('utf-8'))
+        """Send text string ending and append delimiter.
+        Inside batch() the command is queued instead of sent.
+        """
+        self._check_reset(msg)
+
+        if self._batch is not None:
+            self._batch.append(msg)
+            return len(msg) + len(self.delimiter)
+
+        data = (msg + self.delimiter).encode('utf-8')
+        self._socket.sendall(data)
+        return len(data)
+
+    def tx_set(self, cmd, value):
+        """Send setting cmd with value, unless it was already send with that value.
+        Returns the number of bytes send (0 when the write was suppressed).
+        """
+        value = str(value)
+        if self._shadow.get(cmd) == value:
+            return 0
+        self._shadow[cmd] = value
+        return self.tx_txt(cmd + ' ' + value)
+
+    def is_set(self, cmd, value):
+        """True when setting cmd was last send with value."""
+        return self._shadow.get(cmd) == str(value)
+
+    def mark_set(self, cmd, value):
+        """Remember value for setting cmd, e.g. the hash of an uploaded waveform."""
+        self._shadow[cmd] = str(value)
+        return
+
+    def invalidate(self, prefix=''):
+        """Forget the settings starting with prefix (all by default),
+        the next tx_set of those settings is send to the board again.
+        """
+        for cmd in [cmd for cmd in self._shadow if cmd.startswith(prefix)]:
+            del self._shadow[cmd]
+        return
+
+    def _check_reset(self, msg):
+        # Resets change the settings on the board behind the shadow copy.
+        # Only the start of msg is used, waveform uploads are long.
+        cmd = msg[:32].strip().upper().split(' ', 1)[0]
+        if cmd == '*RST':
+            self.invalidate()
+        elif cmd == 'ACQ:RST':
+            self.invalidate('ACQ:')
+        elif cmd == 'GEN:RST':
+            self.invalidate('SOUR')
+            self.invalidate('OUTPUT')
+        elif cmd.endswith(':TRAC:DATA:DATA'):
+            # New waveform, select the function again.
+            self.invalidate(cmd.split(':', 1)[0] + ':FUNC')
+
+    @contextlib.contextmanager
+    def batch(self, read_replies=True):
+        """Queue all commands sent in the with block and send them in one write.
+        Yields a list that receives the replies of the queued queries, in order.
+        With read_replies=False the replies are left on the socket for the
+        caller to read (e.g. with rx_bin). Nested batches join the outer one.
+        txrx_txt inside the block sends the queue first (flush) and returns
+        its reply, that reply is not added to the list. With
+        read_replies=False it raises RuntimeError: the replies of the queued
+        queries would be read in its place.
+        """
+        if self._batch is not None:
+            yield self._replies
+            return
+
+        self._batch = []
+        self._replies = []
+        self._read_replies = read_replies
+        try:
+            yield self._replies
+        finally:
+            try:
+                self.flush()
+            finally:
+                self._batch = None
+
+    def flush(self):
+        """Send the commands queued by batch() as one delimiter-joined write."""
+        pending = self._batch
+        if not pending:
+            return
+        self._batch = []
+
+        data = (self.delimiter.join(pending) + self.delimiter).encode('utf-8')
+        self._socket.sendall(data)
+
+        if self._read_replies:
+            for msg in pending:
+                if msg.split(' ', 1)[0].endswith('?'):
+                    self._replies.append(self.rx_txt())
+        return
 
     def txrx_txt(self, msg):
         """Send/receive text string."""
+        if self._batch is not None:
+            if not self._read_replies:
+                raise RuntimeError('scpi >> txrx_txt(%r) inside batch(read_replies=False)' % msg)
+            self.tx_txt(msg)
+            self.flush()
+            return self._replies.pop()
+
         self.tx_txt(msg)
         return self.rx_txt()
 
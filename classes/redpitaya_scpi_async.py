@@ -0,0 +1,152 @@
+"""Asyncio SCPI access to Red Pitaya."""
+
+import asyncio
+import contextlib
+import numpy as np
+from redpitaya_scpi import scpi
+
+class AsyncScpi (object):
+    """Asyncio SCPI class, same command surface as redpitaya_scpi.scpi.
+
+    tx_txt only queues the command in the transport and returns directly,
+    so the (synchronous) setters of redpitaya_scope and redpitaya_generator
+    can be used as is. Everything that waits for the board is a coroutine.
+    """
+    delimiter = '\r\n'
+
+    # Large enough for a 16384 sample ASCII reply.
+    limit = 2**20
+
+    def __init__(self, host, timeout=None, port=5000):
+        """Initialize object, the connection is opened with await connect().
+        Host IP should be a string in parentheses, like '192.168.1.100'.
+        """
+        self.host    = host
+        self.port    = port
+        self.timeout = timeout
+
+        self._reader = None
+        self._writer = None
+        self._batch  = None
+        self._shadow = {}
+
+    async def connect(self):
+        """Open IP connection."""
+        self._reader, self._writer = await asyncio.wait_for(
+            asyncio.open_connection(self.host, self.port, limit=self.limit),
+            self.timeout)
+        return self
+
+    async def close(self):
+        """Close IP connection."""
+        if self._writer is not None:
+            self._writer.close()
+            await self._writer.wait_closed()
+        self._writer = None
+        self._reader = None
+
+    async def __aenter__(self):
+        return await self.connect()
+
+    async def __aexit__(self, *exc):
+        await self.close()
+
+    async def drain(self):
+        """Wait until the queued commands are handed to the network."""
+        await self._writer.drain()
+
+    async def _read(self, coro):
+        return await asyncio.wait_for(coro, self.timeout)
+
+    async def rx_bytes(self):
+        """Receive a reply and return it as bytes after removing the delimiter."""
+        self.flush()
+        delimiter = self.delimiter.encode('utf-8')
+        msg = await self._read(self._reader.readuntil(delimiter))
+        return msg[:-len(delimiter)]
+
+    async def rx_txt(self):
+        """Receive text string and return it after removing the delimiter."""
+        return (await self.rx_bytes()).decode('utf-8')
+
+    async def rx_bin(self, dtype='>f4'):
+        """Receive an IEEE 488.2 definite length binary block as NumPy array."""
+        self.flush()
+        header = await self._read(self._reader.readexactly(2))
+        if header[0:1] != b'#':
+            raise ValueError('SCPI >> binary block expected, got {!r}'.format(header))
+
+        digits_in_byte_count = int(header[1:2])
+        if digits_in_byte_count == 0:
+            raise ValueError('SCPI >> indefinite length binary blocks are not supported')
+
+        byte_count = int(await self._read(self._reader.readexactly(digits_in_byte_count)))
+        data = await self._read(self._reader.readexactly(byte_count + len(self.delimiter)))
+
+        dtype = np.dtype(dtype)
+        return np.frombuffer(data, dtype=dtype, count=byte_count // dtype.itemsize)
+
+    def tx_txt(self, msg):
+        """Queue text string and append delimiter."""
+        self._check_reset(msg)
+
+        if self._batch is not None:
+            self._batch.append(msg)
+            return len(msg) + len(self.delimiter)
+
+        data = (msg + self.delimiter).encode('utf-8')
+        self._writer.write(data)
+        return len(data)
+
+    # Shadow copy of the settings, same as redpitaya_scpi.scpi
+    tx_set       = scpi.tx_set
+    is_set       = scpi.is_set
+    mark_set     = scpi.mark_set
+    invalidate   = scpi.invalidate
+    _check_reset = scpi._check_reset
+
+    async def txrx_txt(self, msg):
+        """Send/receive text string."""
+        if self._batch is not None:
+            raise RuntimeError('scpi >> txrx_txt(%r) inside batch()' % msg)
+
+        self.tx_txt(msg)
+        return await self.rx_txt()
+
+    @contextlib.contextmanager
+    def batch(self, read_replies=False):
+        """Queue all commands sent in the with block and write them at once.
+        Replies of queued queries stay on the connection, read them in order
+        with rx_txt/rx_bin after the block. read_replies is accepted for
+        compatibility with scpi.batch() but replies are never read here,
+        so txrx_txt inside the block raises RuntimeError.
+        """
+        if self._batch is not None:
+            yield []
+            return
+
+        self._batch = []
+        try:
+            yield []
+        finally:
+            try:
+                self.flush()
+            finally:
+                self._batch = None
+
+    def flush(self):
+        """Write the commands queued by batch() as one delimiter-joined write."""
+        pending = self._batch
+        if not pending:
+            return
+        self._batch = []
+        self._writer.write((self.delimiter.join(pending) + self.delimiter).encode('utf-8'))
+        return
+
+    async def idn_q(self):
+        """Identification Query"""
+        return await self.txrx_txt('*IDN?')
+
+    def rst(self):
+        """Reset Command"""
+        return self.tx_txt('*RST')
@@ -0,0 +1,469 @@
+#==============================================================================
+# Red Pitaya SCPI simulator.
+# Local stand-in for a board so the scripts and classes can be run, tested
+# and benchmarked without hardware.
+#
+# Signal path:
+#   OUT1 (generator) --> IN2
+#   OUT1 (generator) --> filter model (NONE, RC or LC) --> IN1
+# This matches the wiring of the 4CC10 FRF scripts (IN1 = plant output,
+# IN2 = plant input).
+#
+# Start from the command line:
+#   python redpitaya_simulator.py --port 5000 --filter LC --f0 1000 --q 5
+#
+# or from python (port 0 picks a free port):
+#   Sim = redpitaya_simulator(Port = 0, Filter = 'RC', Fc = 1000)
+#   Sim.Start()
+#   Pitaya = scpi.scpi('127.0.0.1', port = Sim.Port)
+#
+# Latency (sec per reply) and Bandwidth (bytes/sec) emulate the network so
+# throughput changes on the client can be measured on a laptop.
+#==============================================================================
+
+import argparse
+import socketserver
+import threading
+import time
+import numpy as np
+
+class redpitaya_simulator:
+    NrSamples       = int(16384)
+    SampleFrequency = 125e6
+
+    def __init__(self, Host = '127.0.0.1', Port = 5000, Filter = 'NONE', Fc = 1000.0, F0 = 1000.0, Q = 5.0,
+                 Noise = 1e-3, Latency = 0.0, Bandwidth = None, Seed = None):
+        self.Host      = Host
+        self.Port      = Port
+        self.Filter    = Filter
+        self.Fc        = Fc
+        self.F0        = F0
+        self.Q         = Q
+        self.Noise     = Noise
+        self.Latency   = Latency
+        self.Bandwidth = Bandwidth
+
+        self.Lock      = threading.Lock()
+        self.Random    = np.random.default_rng(Seed)
+        self.T0        = time.perf_counter()
+        self.Server    = None
+
+        self.Reset()
+        self.ResetGenerator()
+        return
+
+    #==============================================================================
+    # State
+    #==============================================================================
+    def Reset(self):
+        self.Decimation   = 1
+        self.TriggerConf  = 'DISABLED'
+        self.TriggerDelay = 0
+        self.TriggerLevel = 0.0
+        self.DataFormat   = 'ASCII'
+        self.DataUnits    = 'VOLTS'
+        self.Average      = 0
+        self.Gain         = ['LV', 'LV']
+        self.Running      = False
+        self.Triggered    = False
+        self.FillTime     = 0.0
+        self.Buffer       = np.zeros((2, self.NrSamples))
+        self.BufferOffset = 0
+        return
+
+    def ResetGenerator(self):
+        self.Gen = []
+        for i in range(2):
+            self.Gen.append({'Func'      : 'SINE',
+                             'Amplitude' : 1.0,
+                             'Frequency' : 1000.0,
+                             'State'     : False,
+                             'Data'      : np.zeros(self.NrSamples)})
+        return
+
+    def Now(self):
+        return time.perf_counter() - self.T0
+
+    # Position of the ADC write pointer in the circular buffer
+    def WritePosition(self):
+        return int(self.Now() * self.SampleFrequency / self.Decimation) % self.NrSamples
+
+    #==============================================================================
+    # Signal synthesis
+    #==============================================================================
+    def GetOutput(self, Channel, t):
+        Gen = self.Gen[Channel - 1]
+        if not Gen['State']:
+            return np.zeros(np.size(t))
+
+        phase = np.mod(t * Gen['Frequency'], 1.0)
+        Func  = Gen['Func']
+
+        if (Func == 'SINE'):
+            y = np.sin(2 * np.pi * phase)
+        elif (Func == 'SQUARE'):
+            y = np.where(phase < 0.5, 1.0, -1.0)
+        elif (Func == 'TRIANGLE'):
+            y = 1.0 - 4.0 * np.abs(phase - 0.5)
+        elif (Func == 'SAWU'):
+            y = 2.0 * phase - 1.0
+        elif (Func == 'SAWD'):
+            y = 1.0 - 2.0 * phase
+        elif (Func == 'PWM'):
+            y = np.where(phase < 0.5, 1.0, -1.0)
+        elif (Func == 'DC'):
+            y = np.ones(np.size(t))
+        elif (Func == 'DC_NEG'):
+            y = -np.ones(np.size(t))
+        else:
+            Data = Gen['Data']
+            y = Data[(phase * np.size(Data)).astype(int) % np.size(Data)]
+
+        return Gen['Amplitude'] * y
+
+    def GetFilterResponse(self, f):
+        if (self.Filter == 'RC'):
+            return 1.0 / (1.0 + 1j * f / self.Fc)
+
+        if (self.Filter == 'LC'):
+            return 1.0 / (1.0 - (f / self.F0)**2 + 1j * f / (self.Q * self.F0))
+
+        return np.ones(np.size(f))
+
+    #==============================================================================
+    # Synthesize 4 buffers of history, both inputs in Volt (before the input gain)
+    # Filtering is done in the frequency domain, the first part of the
+    # record absorbs the wrap around of the circular convolution.
+    #==============================================================================
+    def Synthesize(self, t_end):
+        L  = 4 * self.NrSamples
+        dt = self.Decimation / self.SampleFrequency
+        t  = t_end - (L - 1 - np.arange(L)) * dt
+
+        Out1 = self.GetOutput(1, t)
+        f    = np.fft.rfftfreq(L, dt)
+        In1  = np.fft.irfft(np.fft.rfft(Out1) * self.GetFilterResponse(f), L)
+        In2  = Out1
+
+        Data = np.vstack((In1, In2))
+        Data = Data + self.Noise * self.Random.standard_normal(Data.shape)
+        return Data
+
+    def TriggerIndex(self):
+        # Position of the trigger in the buffer, see redpitaya_scope.SetTrigger
+        return int(np.clip(self.NrSamples // 2 - self.TriggerDelay, 0, self.NrSamples))
+
+    def TryTrigger(self):
+        if not self.Running or self.Triggered or (self.TriggerConf == 'DISABLED'):
+            return
+
+        N    = self.NrSamples
+        Data = self.Synthesize(self.Now())
+
+        if (self.TriggerConf == 'NOW'):
+            k = 3 * N
+        else:
+            Source = self.TriggerConf[:3]
+            Edge   = self.TriggerConf[-2:]
+
+            if (Source == 'CH1'):
+                x, Level = Data[0], self.TriggerLevel
+            elif (Source == 'CH2'):
+                x, Level = Data[1], self.TriggerLevel
+            else:
+                # EXT and AWG: use the generator output crossing zero
+                x, Level = Data[1], 0.0
+
+            if (Edge == 'PE'):
+                Edges = np.nonzero((x[2*N-1:3*N-1] < Level) & (x[2*N:3*N] >= Level))[0]
+            else:
+                Edges = np.nonzero((x[2*N-1:3*N-1] > Level) & (x[2*N:3*N] <= Level))[0]
+
+            if (np.size(Edges) == 0):
+                return
+
+            k = 2 * N + Edges[0]
+
+        Start = k - self.TriggerIndex()
+        self.Buffer      = Data[:, Start:Start + N]
+        self.Triggered   = True
+        self.TriggerConf = 'DISABLED'
+
+        # Buffer[0] is at this position in the circular buffer of the board
+        self.BufferOffset = (self.WritePosition() + self.TriggerIndex() + 1) % N
+
+        # Data is complete once the samples after the trigger are written.
+        self.FillTime = self.Now() + (N - self.TriggerIndex()) * self.Decimation / self.SampleFrequency
+        return
+
+    def IsFilled(self):
+        return self.Triggered and (self.Now() >= self.FillTime)
+
+    #==============================================================================
+    # Data replies
+    #==============================================================================
+    def GetData(self, Channel):
+        return self.ScaleData(Channel, self.Buffer[Channel - 1])
+
+    def ScaleData(self, Channel, Data):
+        if (self.Gain[Channel - 1] == 'HV'):
+            Data = Data / 10.0
+        return np.clip(Data, -1.0, 1.0 - 1.0 / 8192)
+
+    # Length samples from Position in the circular buffer (wraps around).
+    # Without a trigger the ADC keeps writing: every position holds the
+    # sample written the last time the write pointer passed it.
+    def GetDataCircular(self, Channel, Position, Length):
+        Positions = Position + np.arange(Length)
+
+        if self.Running and not self.Triggered:
+            dt   = self.Decimation / self.SampleFrequency
+            S    = int(self.Now() / dt)
+            Data = self.Synthesize(S * dt)[Channel - 1]
+            Ages = (S - Positions) % self.NrSamples
+            return self.ScaleData(Channel, Data[len(Data) - 1 - Ages])
+
+        Index = (Positions - self.BufferOffset) % self.NrSamples
+        return self.GetData(Channel)[Index]
+
+    def FormatData(self, Data):
+        if (self.DataFormat == 'BIN'):
+            if (self.DataUnits == 'RAW'):
+                Body = np.round(Data * 8192).astype('>i2').tobytes()
+            else:
+                Body = Data.astype('>f4').tobytes()
+
+            Length = str(len(Body)).encode('utf-8')
+            return b'#' + str(len(Length)).encode('utf-8') + Length + Body
+
+        if (self.DataUnits == 'RAW'):
+            Text = ','.join(map(str, np.round(Data * 8192).astype(int)))
+        else:
+            Text = ','.join(['%.5f' % v for v in Data])
+
+        return ('{' + Text + '}').encode('utf-8')
+
+    #==============================================================================
+    # Command handling, returns the reply (bytes) or None
+    #==============================================================================
+    def Execute(self, Command):
+        Parts = Command.strip().split(' ', 1)
+        Head  = Parts[0].upper()
+        Arg   = Parts[1].strip() if (len(Parts) > 1) else ''
+
+        with self.Lock:
+            return self.Dispatch(Head, Arg)
+
+    def Dispatch(self, Head, Arg):
+        # General
+        if (Head == '*IDN?'):
+            return b'REDPITAYA,INSTR2014,0,SIMULATOR'
+        if (Head == '*RST'):
+            self.Reset()
+            self.ResetGenerator()
+            return None
+        if Head.startswith('DIG:') or Head.startswith('*'):
+            return None
+
+        # Acquisition
+        if (Head == 'ACQ:RST'):
+            self.Reset()
+            return None
+        if (Head == 'ACQ:START'):
+            self.Running   = True
+            self.Triggered = False
+            return None
+        if (Head == 'ACQ:STOP'):
+            self.Running = False
+            return None
+        if (Head == 'ACQ:DEC'):
+            self.Decimation = int(Arg)
+            return None
+        if (Head == 'ACQ:DEC?'):
+            return str(self.Decimation).encode('utf-8')
+        if (Head == 'ACQ:AVG'):
+            self.Average = Arg
+            return None
+        if (Head == 'ACQ:DATA:FORMAT'):
+            self.DataFormat = Arg.upper()
+            return None
+        if (Head == 'ACQ:DATA:UNITS'):
+            self.DataUnits = Arg.upper()
+            return None
+        if (Head == 'ACQ:TRIG'):
+            self.TriggerConf = Arg.upper()
+            if (self.TriggerConf != 'DISABLED'):
+                self.Triggered = False
+            self.TryTrigger()
+            return None
+        if (Head == 'ACQ:TRIG:DLY'):
+            self.TriggerDelay = int(Arg)
+            return None
+        if (Head == 'ACQ:TRIG:DLY?'):
+            return str(self.TriggerDelay).encode('utf-8')
+        if (Head == 'ACQ:TRIG:LEV'):
+            self.TriggerLevel = float(Arg)
+            return None
+        if (Head == 'ACQ:TRIG:STAT?'):
+            self.TryTrigger()
+            return b'TD' if self.Triggered else b'WAIT'
+        if (Head == 'ACQ:TRIG:FILL?'):
+            return b'1' if self.IsFilled() else b'0'
+        if (Head == 'ACQ:TPOS?'):
+            return str((self.BufferOffset + self.TriggerIndex()) % self.NrSamples).encode('utf-8')
+        if (Head == 'ACQ:WPOS?'):
+            if self.IsFilled():
+                return str(self.BufferOffset).encode('utf-8')
+            return str(self.WritePosition()).encode('utf-8')
+
+        if Head.startswith('ACQ:SOUR'):
+            Channel = int(Head[8])
+            Sub     = Head[10:]
+
+            if (Sub == 'GAIN'):
+                self.Gain[Channel - 1] = Arg.upper()
+                return None
+            if (Sub == 'DATA?'):
+                return self.FormatData(self.GetData(Channel))
+
+            # Window reads, positions in the circular buffer
+            Args = [int(a) for a in Arg.split(',')] if Arg else []
+            if (Sub == 'DATA:STA:N?'):
+                return self.FormatData(self.GetDataCircular(Channel, Args[0], Args[1]))
+            if (Sub == 'DATA:STA:END?'):
+                Length = (Args[1] - Args[0]) % self.NrSamples + 1
+                return self.FormatData(self.GetDataCircular(Channel, Args[0], Length))
+            if (Sub == 'DATA:OLD:N?'):
+                return self.FormatData(self.GetData(Channel)[:Args[0]])
+            if (Sub == 'DATA:LAT:N?'):
+                return self.FormatData(self.GetData(Channel)[self.NrSamples - Args[0]:])
+
+        # Generator
+        if Head.startswith('SOUR'):
+            Channel = int(Head[4])
+            Gen     = self.Gen[Channel - 1]
+            Sub     = Head[6:]
+
+            if (Sub == 'FUNC'):
+                Gen['Func'] = Arg.upper()
+                return None
+            if (Sub == 'VOLT'):
+                Gen['Amplitude'] = float(Arg)
+                return None
+            if (Sub == 'FREQ:FIX'):
+                Gen['Frequency'] = float(Arg)
+                return None
+            if (Sub == 'TRAC:DATA:DATA'):
+                Gen['Data'] = np.clip(np.array(Arg.split(','), dtype=float), -1.0, 1.0)
+                return None
+
+        if Head.startswith('OUTPUT'):
+            State = (Arg.upper() == 'ON')
+            if (Head == 'OUTPUT:STATE'):
+                self.Gen[0]['State'] = State
+                self.Gen[1]['State'] = State
+            else:
+                self.Gen[int(Head[6]) - 1]['State'] = State
+            return None
+
+        print('SIM >> unknown command: ' + Head)
+        return None
+
+    #==============================================================================
+    # Network
+    #==============================================================================
+    def Send(self, sock, Reply):
+        if (self.Latency > 0):
+            time.sleep(self.Latency)
+
+        Reply = Reply + b'\r\n'
+
+        if not self.Bandwidth:
+            sock.sendall(Reply)
+            return
+
+        ChunkSize = 65536
+        for i in range(0, len(Reply), ChunkSize):
+            Chunk = Reply[i:i + ChunkSize]
+            sock.sendall(Chunk)
+            time.sleep(len(Chunk) / self.Bandwidth)
+        return
+
+    def Start(self):
+        """Serve in a background thread, returns the port in use."""
+        self.Server = _server((self.Host, self.Port), _handler)
+        self.Server.Simulator = self
+        self.Port = self.Server.server_address[1]
+
+        thread = threading.Thread(target=self.Server.serve_forever, daemon=True)
+        thread.start()
+        return self.Port
+
+    def Stop(self):
+        if self.Server is not None:
+            self.Server.shutdown()
+            self.Server.server_close()
+        self.Server = None
+        return
+
+    def Serve(self):
+        """Serve until interrupted."""
+        self.Server = _server((self.Host, self.Port), _handler)
+        self.Server.Simulator = self
+        print('SIM >> listening on %s:%d' % self.Server.server_address)
+        try:
+            self.Server.serve_forever()
+        except KeyboardInterrupt:
+            print('interrupted!')
+        self.Server.server_close()
+        return
+
+
+class _server(socketserver.ThreadingTCPServer):
+    allow_reuse_address = True
+    daemon_threads      = True
+
+
+class _handler(socketserver.BaseRequestHandler):
+    def handle(self):
+        Sim = self.server.Simulator
+        buf = b''
+        while True:
+            chunk = self.request.recv(65536)
+            if not chunk:
+                break
+            buf += chunk
+
+            # Commands end with \r\n, a line can hold several ; separated commands
+            *Lines, buf = buf.split(b'\n')
+            for Line in Lines:
+                for Command in Line.decode('utf-8').strip().split(';'):
+                    if not Command.strip():
+                        continue
+                    Reply = Sim.Execute(Command)
+                    if Reply is not None:
+                        Sim.Send(self.request, Reply)
+        return
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Red Pitaya SCPI simulator')
+    parser.add_argument('--host',      default='127.0.0.1')
+    parser.add_argument('--port',      type=int,   default=5000)
+    parser.add_argument('--filter',    default='NONE', choices=['NONE', 'RC', 'LC'])
+    parser.add_argument('--fc',        type=float, default=1000.0, help='RC cut-off frequency [Hz]')
+    parser.add_argument('--f0',        type=float, default=1000.0, help='LC resonance frequency [Hz]')
+    parser.add_argument('--q',         type=float, default=5.0,    help='LC quality factor')
+    parser.add_argument('--noise',     type=float, default=1e-3,   help='Input noise [Volt rms]')
+    parser.add_argument('--latency',   type=float, default=0.0,    help='Delay per reply [sec]')
+    parser.add_argument('--bandwidth', type=float, default=None,   help='Reply bandwidth [bytes/sec]')
+    args = parser.parse_args()
+
+    Sim = redpitaya_simulator(Host = args.host, Port = args.port, Filter = args.filter,
+                              Fc = args.fc, F0 = args.f0, Q = args.q, Noise = args.noise,
+                              Latency = args.latency, Bandwidth = args.bandwidth)
+    Sim.Serve()
+
+
+if __name__== "__main__":
+    main()
@@ -0,0 +1,176 @@
+import time
+import collections
+import numpy as np
+
+#==============================================================================
+# Continuous acquisition over SCPI.
+# Without a trigger the board keeps writing the ADC samples in its circular
+# buffer of NrSamples. The write pointer (ACQ:WPOS?) is polled and everything
+# written since the previous read is downloaded (ACQ:SOURx:DATA:STA:N?).
+# As long as a read cycle takes less time than filling the buffer the record
+# is gap free, otherwise the lost samples are counted and the block is marked.
+#
+# Stream = redpitaya_stream(Scope)
+# for Block in Stream.Blocks(BlockSize = 16384, Duration = 10.0):
+#     Block.Sequence, Block.Index, Block.Data (2, BlockSize), Block.Dropped
+#
+# Index is the number of the first sample since the start, lost samples
+# included, so Index / Scope.Frequency is the time of the block.
+# Only a few blocks are in memory at any time, the record can be written to
+# a datastorage stream or added to an frf_accumulator per block.
+#
+# The maximum gap free rate depends on the network: at decimation 1 the
+# buffer is full after 131 usec, streaming is for the larger decimations.
+#==============================================================================
+stream_block = collections.namedtuple('stream_block', ['Sequence', 'Index', 'Data', 'Dropped'])
+
+
+class redpitaya_stream:
+    PollInterval = 0.001
+    SafetyMargin = 0.1     # part of the buffer that may be overwritten while reading
+
+    def __init__(self, Scope):
+        self.Scope     = Scope
+        self.rp        = Scope.rp
+        self.Running   = False
+        self.Position  = 0
+        self.Index     = 0
+        self.NrLost    = 0
+        self.NrDrops   = 0
+        return
+
+    def GetSamplePeriod(self):
+        return self.Scope.Decimation / self.Scope.SampleFrequency
+
+    #==============================================================================
+    # Free running acquisition: trigger disabled, the buffer is never frozen.
+    #==============================================================================
+    def Start(self):
+        self.Scope.SetDataFormat('BIN', 'VOLTS')
+        self.Scope.SetTrigger(Trigger = 'DISABLED')
+        self.Scope.Start()
+
+        self.Position = int(self.rp.txrx_txt('ACQ:WPOS?'))
+        self.LastTime = time.perf_counter()
+        self.Index    = 0
+        self.NrLost   = 0
+        self.NrDrops  = 0
+        self.Running  = True
+        return
+
+    def Stop(self):
+        self.Running = False
+        self.Scope.Stop()
+        return
+
+    #==============================================================================
+    # One read cycle: all samples written since the previous cycle.
+    # Returns (Index, Data (2, n), Lost), Lost = samples lost before Data.
+    #==============================================================================
+    def Read(self):
+        N = self.Scope.NrSamples
+
+        while 1:
+            Now      = time.perf_counter()
+            Position = int(self.rp.txrx_txt('ACQ:WPOS?'))
+            Count    = (Position - self.Position) % N
+            if (Count > 0):
+                break
+            time.sleep(self.PollInterval)
+
+        # The write pointer only tells where it is, not how often it wrapped.
+        # The time since the previous cycle does.
+        Elapsed = (Now - self.LastTime) / self.GetSamplePeriod()
+        Lost    = 0
+
+        if (Elapsed > (1.0 - self.SafetyMargin) * N):
+            # The oldest part can already be overwritten: only read the
+            # newest part and count the rest as lost. Count is the wrapped
+            # pointer distance, everything written before it is lost.
+            Keep  = int((1.0 - self.SafetyMargin) * N)
+            Count = min(Count, Keep)
+            Lost  = max(int(round(Elapsed)) - Count, 0)
+            self.Position = (Position - Count) % N
+
+        Data = np.empty((2, Count), dtype=np.float32)
+        with self.rp.batch(read_replies = False):
+            self.rp.tx_txt('ACQ:SOUR1:DATA:STA:N? %d,%d' % (self.Position, Count))
+            self.rp.tx_txt('ACQ:SOUR2:DATA:STA:N? %d,%d' % (self.Position, Count))
+
+        self.rp.rx_bin('>f4', out = Data[0])
+        self.rp.rx_bin('>f4', out = Data[1])
+
+        Data[0] *= self.Scope.GetGain(1)
+        Data[1] *= self.Scope.GetGain(2)
+
+        # The samples written during the transfer must not have reached the
+        # start of what was read.
+        During = (time.perf_counter() - Now) / self.GetSamplePeriod()
+        if (Count + During > N):
+            Lost = max(Lost, 1)
+
+        Index = self.Index + Lost
+        self.Index    = Index + Count
+        self.Position = Position
+        self.LastTime = Now
+
+        if (Lost > 0):
+            self.NrLost  += Lost
+            self.NrDrops += 1
+
+        return Index, Data, Lost
+
+    #==============================================================================
+    # Generator of blocks of BlockSize samples (None: the size of each read).
+    # After lost samples the partial block is dropped and the next block starts
+    # at the first new sample with Dropped = True.
+    # Stops after Duration seconds or MaxBlocks blocks (None: endless).
+    #==============================================================================
+    def Blocks(self, BlockSize = None, Duration = None, MaxBlocks = None):
+        if not self.Running:
+            self.Start()
+
+        Start    = time.perf_counter()
+        Sequence = 0
+        Pending  = []
+        Size     = 0
+        First    = self.Index
+        Dropped  = False
+
+        try:
+            while self.Running:
+                if (Duration is not None) and (time.perf_counter() - Start > Duration):
+                    break
+                if (MaxBlocks is not None) and (Sequence >= MaxBlocks):
+                    break
+
+                Index, Data, Lost = self.Read()
+
+                if (Lost > 0):
+                    Pending = []
+                    Size    = 0
+                    First   = Index
+                    Dropped = True
+
+                if BlockSize is None:
+                    yield stream_block(Sequence, Index, Data, Dropped)
+                    Sequence += 1
+                    Dropped   = False
+                    continue
+
+                Pending.append(Data)
+                Size += Data.shape[1]
+
+                while (Size >= BlockSize):
+                    Buffer = np.concatenate(Pending, axis=1) if (len(Pending) > 1) else Pending[0]
+
+                    yield stream_block(Sequence, First, Buffer[:, :BlockSize], Dropped)
+                    Sequence += 1
+                    Dropped   = False
+
+                    Pending = [Buffer[:, BlockSize:]]
+                    Size   -= BlockSize
+                    First  += BlockSize
+        finally:
+            self.Stop()
+        return
@@ -0,0 +1,205 @@
+import time
+import numpy as np
+
+#==============================================================================
+# Stepped sine FRF measurement.
+# The generator steps through a list of frequencies, per step the scope gets
+# the smallest decimation that holds the settling and the measured periods.
+# Amplitude and phase of both channels are estimated with a lock-in (single
+# bin DFT over an integer number of periods), H = Output / Input.
+#
+# Sweep  = sine_sweep(Scope, Generator, Amplitude = 0.5)
+# Result = Sweep.Run(FrequencyMin = 100, FrequencyMax = 20000, NrPoints = 25)
+# plt.semilogx(Result.Freq, Result.GetMagnitude_dB())
+#
+# The settling is not waited for: the capture starts when the frequency is
+# set, the first SettlingPeriods periods of the record are skipped.
+# Where the response bends (resonances, notches, corners) extra frequencies
+# are measured: the middle point of three may not differ more than
+# MaxError_dB / MaxError_deg from the straight line (log f) through the others.
+#==============================================================================
+class sine_sweep:
+
+    def __init__(self, Scope, Generator, Channel = 1, Amplitude = 0.5, InputChannel = 2, OutputChannel = 1):
+        self.Scope           = Scope
+        self.Generator       = Generator
+        self.Channel         = Channel
+        self.Amplitude       = Amplitude
+        self.InputChannel    = InputChannel
+        self.OutputChannel   = OutputChannel
+
+        self.Periods         = 10       # periods used by the lock-in
+        self.SettlingPeriods = 10       # periods skipped at the start of the record
+        self.SettlingTime    = 0.0      # minimum skipped time [sec], e.g. a slow plant
+        self.Oversampling    = 10
+        self.Timeout         = 5.0
+
+        self.MaxError_dB     = 0.5
+        self.MaxError_deg    = 5.0
+        self.MinRatio        = 1.005    # no refinement between closer frequencies
+        self.MaxRefinements  = 4
+        self.MaxPoints       = 200
+        return
+
+    #==============================================================================
+    # Log spaced sweep, followed by up to MaxRefinements refinement passes.
+    #==============================================================================
+    def Run(self, FrequencyMin, FrequencyMax, NrPoints = 25, Refine = True):
+        Result = sweep_result()
+        Start  = time.perf_counter()
+
+        self.Scope.SetDataFormat('BIN', 'VOLTS')
+        self.Generator.Sine(Channel = self.Channel, Amplitude = self.Amplitude, Frequency = FrequencyMin)
+        self.Generator.EnableOutput(Channel = self.Channel)
+
+        self.MeasureList(Result, np.geomspace(FrequencyMin, FrequencyMax, NrPoints))
+
+        for i in range(self.MaxRefinements if Refine else 0):
+            Frequencies = self.GetRefinement(Result)
+            Frequencies = Frequencies[:max(0, self.MaxPoints - len(Result))]
+            if (len(Frequencies) == 0):
+                break
+
+            print("Refinement %d    : %d frequencies" % (i + 1, len(Frequencies)))
+            self.MeasureList(Result, Frequencies)
+
+        print("Sweep           : %d frequencies in %.1f sec" % (len(Result), time.perf_counter() - Start))
+        return Result
+
+    def MeasureList(self, Result, Frequencies):
+        for Frequency in Frequencies:
+            Amplitudes, Decimation = self.Measure(Frequency)
+            Result.Add(Frequency, Amplitudes[self.InputChannel - 1], Amplitudes[self.OutputChannel - 1], Decimation)
+        return
+
+    #==============================================================================
+    # One step: set the frequency, capture, lock-in.
+    # Returns the complex amplitudes of both channels and the decimation.
+    #==============================================================================
+    def Measure(self, Frequency):
+        Scope  = self.Scope
+        Settle = max(self.SettlingPeriods / Frequency, self.SettlingTime)
+
+        Index = Scope.GetDecimationIndexFor(Frequency, Frequency, Periods = self.Periods + Settle * Frequency,
+                                            Oversampling = self.Oversampling, Verbose = False)
+        Scope.SetDecimationBeta(Index)
+
+        # The complete buffer after the trigger, the trigger is at ACQ:START
+        Scope.SetTrigger(Trigger = 'NOW', Delay = Scope.NrSamples // 2)
+
+        self.Generator.Sine(Channel = self.Channel, Amplitude = self.Amplitude, Frequency = Frequency)
+
+        # Not enough room in the record for the settling: wait for the rest
+        Skip  = int(np.ceil(Settle * Scope.Frequency))
+        Spare = Scope.NrSamples - int(np.ceil(self.Periods * Scope.Frequency / Frequency))
+        if (Skip > Spare):
+            time.sleep((Skip - max(Spare, 0)) / Scope.Frequency)
+            Skip = max(Spare, 0)
+
+        Scope.Start()
+        Scope.WaitForTrigger(self.Timeout)
+        Data = Scope.GetDataBoth()
+
+        Range = np.array([Scope.GetGain(1), Scope.GetGain(2)])
+        if np.any(np.max(np.abs(Data), axis=1) >= 0.99 * Range):
+            print("Warning: input clipped at %.1f Hz, use HV or a lower amplitude" % Frequency)
+
+        return LockIn(Data[:, Skip:], Frequency, Scope.Frequency), Scope.Decimation
+
+    #==============================================================================
+    # Geometric midpoints on both sides of the points where the straight line
+    # through the neighbours misses the measurement.
+    #==============================================================================
+    def GetRefinement(self, Result):
+        if (len(Result) < 3):
+            return np.zeros(0)
+
+        Freq  = Result.Freq
+        x     = np.log(Freq)
+        dB    = Result.GetMagnitude_dB()
+        Phase = np.unwrap(np.angle(Result.H)) * 180.0 / np.pi
+
+        Weight = (x[1:-1] - x[:-2]) / (x[2:] - x[:-2])
+        Error_dB  = dB[1:-1] - (dB[:-2] + Weight * (dB[2:] - dB[:-2]))
+        Error_deg = Phase[1:-1] - (Phase[:-2] + Weight * (Phase[2:] - Phase[:-2]))
+        Bend = (np.abs(Error_dB) > self.MaxError_dB) | (np.abs(Error_deg) > self.MaxError_deg)
+
+        # Point i bends: refine the steps i-1..i and i..i+1
+        Coarse = np.zeros(len(Freq) - 1, dtype=bool)
+        Coarse[:-1] |= Bend
+        Coarse[1:]  |= Bend
+        Coarse &= (Freq[1:] / Freq[:-1]) > self.MinRatio
+
+        return np.sqrt(Freq[:-1] * Freq[1:])[Coarse]
+
+
+#==============================================================================
+# Lock-in: complex amplitude of the Frequency component of Data (..., N),
+# all rows (channels, captures) in one matrix product. Only an integer number
+# of periods is used, so a sine does not leak into the estimate.
+#   x(n) = |A| cos(2 pi f n / fs + angle(A))
+#==============================================================================
+def LockIn(Data, Frequency, SampleFrequency):
+    Data = np.asarray(Data, dtype=float)
+    N    = Data.shape[-1]
+
+    Periods = np.floor(N * Frequency / SampleFrequency)
+    if (Periods >= 1):
+        N = int(round(Periods * SampleFrequency / Frequency))
+        N = min(N, Data.shape[-1])
+
+    Reference = np.exp(-2j * np.pi * Frequency / SampleFrequency * np.arange(N))
+    return (2.0 / N) * (Data[..., :N] @ Reference)
+
+
+#==============================================================================
+# Stepped sine result, kept sorted on frequency. Same access functions as
+# frf_result (GetH, GetMagnitude_dB, GetPhase_deg).
+#==============================================================================
+class sweep_result:
+
+    def __init__(self):
+        self.Freq       = np.zeros(0)
+        self.Input      = np.zeros(0, dtype=complex)
+        self.Output     = np.zeros(0, dtype=complex)
+        self.Decimation = np.zeros(0, dtype=int)
+        return
+
+    def Add(self, Frequency, Input, Output, Decimation):
+        i = np.searchsorted(self.Freq, Frequency)
+
+        self.Freq       = np.insert(self.Freq, i, Frequency)
+        self.Input      = np.insert(self.Input, i, Input)
+        self.Output     = np.insert(self.Output, i, Output)
+        self.Decimation = np.insert(self.Decimation, i, Decimation)
+        return
+
+    def __len__(self):
+        return len(self.Freq)
+
+    @property
+    def H(self):
+        with np.errstate(divide='ignore', invalid='ignore'):
+            return self.Output / self.Input
+
+    def GetH(self, Estimator = 'H1'):
+        return self.H
+
+    def GetMagnitude_dB(self, Estimator = 'H1'):
+        with np.errstate(divide='ignore'):
+            return 20 * np.log10(np.abs(self.H))
+
+    def GetPhase_deg(self, Estimator = 'H1'):
+        return np.angle(self.H, deg=True)
+
+    def Save(self, Filename):
+        np.savez(Filename, Freq=self.Freq, Input=self.Input, Output=self.Output, Decimation=self.Decimation)
+        return
+
+    def Load(self, Filename):
+        with np.load(Filename) as Data:
+            self.Freq       = Data['Freq']
+            self.Input      = Data['Input']
+            self.Output     = Data['Output']
+            self.Decimation = Data['Decimation']
+        return
@@ -0,0 +1,66 @@
+import os
+import numpy as np
+
+#==============================================================================
+# On-disk library of arbitrary waveforms for redpitaya_generator.
+# A waveform is generated once, stored as .npy under its name and parameters
+# and loaded (memory-mapped) afterwards.
+#
+# Library = waveform_library()
+# Generator.Arbitrary(Channel = 1, Samples = Library.Noise(Seed = 42),
+#                     Amplitude = 0.5, Frequency = 122070.0 / 16384.0)
+#
+# Together with the waveform hash in redpitaya_generator the same buffer is
+# also only uploaded once per connection.
+#==============================================================================
+class waveform_library:
+    NrSamples = int(16384)
+
+    def __init__(self, Path = None):
+        if Path is None:
+            Path = os.path.join(os.path.expanduser('~'), '.redpitaya', 'waveforms')
+
+        self.Path = Path
+        os.makedirs(self.Path, exist_ok=True)
+        return
+
+    #==============================================================================
+    # Return the waveform Name with Params, Function(**Params) is only called
+    # when it is not in the library yet.
+    #==============================================================================
+    def Get(self, Name, Function, **Params):
+        Filename = self.GetFilename(Name, **Params)
+
+        if os.path.exists(Filename):
+            return np.load(Filename, mmap_mode='r')
+
+        Samples = np.clip(np.asarray(Function(**Params), dtype=float), -1.0, 1.0)
+        self.Save(Filename, Samples)
+        return Samples
+
+    def GetFilename(self, Name, **Params):
+        Key = [Name] + ['%s-%s' % (k, Params[k]) for k in sorted(Params)]
+        return os.path.join(self.Path, '_'.join(Key) + '.npy')
+
+    def Save(self, Filename, Samples):
+        # Write to a temporary file first, a half written file is never loaded.
+        Temp = Filename + '.tmp'
+        with open(Temp, 'wb') as filehandle:
+            np.save(filehandle, Samples)
+        os.replace(Temp, Filename)
+        return
+
+    def List(self):
+        return sorted(f[:-4] for f in os.listdir(self.Path) if f.endswith('.npy'))
+
+    #==============================================================================
+    # Waveforms
+    #==============================================================================
+    def Noise(self, Seed = 42, NrSamples = None):
+        if NrSamples is None:
+            NrSamples = self.NrSamples
+        return self.Get('noise', _noise, Seed = Seed, NrSamples = NrSamples)
+
+
+def _noise(Seed, NrSamples):
+    return np.random.default_rng(Seed).uniform(-1.0, 1.0, NrSamples)
@@ -0,0 +1,198 @@
+import os
+import time
+import numpy as np
+
+
+# =================================================================================
+# Archive of raw scope captures.
+#
+#   archive/samples.i16   int16 ADC counts of all captures, appended
+#   archive/index.bin     one record per capture (index_dtype): position in
+#                         samples.i16 and the scope settings at capture time
+#
+# Both files are memory-mapped for reading. A query only touches the index,
+# the captures it returns are views on samples.i16: nothing is copied and
+# unrelated captures are never read.
+#
+# Archive = capture_archive('archive')
+# Archive.add_capture(Scope)
+# for Data in Archive.select(trigger='CH1_PE', decimation=64, gain=(10, 10)):
+#     ...
+# =================================================================================
+index_dtype = np.dtype([
+    ('offset', '<i8'),              # first sample in samples.i16
+    ('nr_channels', '<i2'),
+    ('nr_samples', '<i4'),
+    ('timestamp', '<f8'),           # time.time() of the trigger
+    ('window_start', '<i4'),        # first sample of the capture in the full buffer
+    ('board', 'S32'),
+    ('decimation', '<i4'),
+    ('frequency', '<f8'),           # sample frequency [Hz]
+    ('trigger', 'S8'),
+    ('trigger_level', '<f4'),
+    ('trigger_delay', '<i4'),
+    ('average', '<i2'),
+    ('gain', '<i2', (2,)),
+    ('probe', '<f4', (2,)),
+    ('scale', '<f4', (2,)),         # Volt per ADC count, including gain and probe
+])
+
+adc_counts = 8192
+
+
+class capture_archive:
+    samples_file = 'samples.i16'
+    index_file = 'index.bin'
+
+    def __init__(self, path):
+        self.path = path
+        os.makedirs(path, exist_ok=True)
+
+        self.samples_name = os.path.join(path, self.samples_file)
+        self.index_name = os.path.join(path, self.index_file)
+
+        for filename in (self.samples_name, self.index_name):
+            if not os.path.exists(filename):
+                open(filename, 'wb').close()
+
+        self.samples_map = None
+        self.index_map = None
+        return
+
+    # =================================================================================
+    # Add a capture: data = (nr_channels, nr_samples) int16 ADC counts.
+    # settings = redpitaya_scope.GetSettings(), start = the first sample of data
+    # in the full buffer (SetWindow), timestamp = the trigger time.
+    # The samples are written before the index record, an interrupted add
+    # leaves unused samples but never an index record without data.
+    # =================================================================================
+    def add(self, data, settings, board='', timestamp=None, start=0):
+        data = np.atleast_2d(np.asarray(data, dtype='<i2'))
+        if (data.shape[0] > 2):
+            raise ValueError('capture_archive >> at most 2 channels, got %d' % data.shape[0])
+
+        if timestamp is None:
+            timestamp = time.time()
+
+        with open(self.samples_name, 'ab') as filehandle:
+            offset = filehandle.tell() // 2
+            filehandle.write(np.ascontiguousarray(data).tobytes())
+
+        gain = np.asarray(settings['Gain'])
+        probe = np.asarray(settings['Probe'])
+
+        record = np.zeros(1, dtype=index_dtype)
+        record['offset'] = offset
+        record['nr_channels'] = data.shape[0]
+        record['nr_samples'] = data.shape[1]
+        record['timestamp'] = timestamp
+        record['window_start'] = start
+        record['board'] = str(board).encode()
+        record['decimation'] = settings['Decimation']
+        record['frequency'] = settings['Frequency']
+        record['trigger'] = str(settings['Trigger'] or '').encode()
+        record['trigger_level'] = settings['TriggerLevel']
+        record['trigger_delay'] = settings['TriggerDelay']
+        record['average'] = settings['Average']
+        record['gain'] = gain
+        record['probe'] = probe
+        record['scale'] = gain * probe / adc_counts
+
+        with open(self.index_name, 'ab') as filehandle:
+            filehandle.write(record.tobytes())
+
+        return len(self) - 1
+
+    # Read both channels of a finished capture as ADC counts and add them,
+    # stamped with the TriggerTime of scope.WaitForTrigger.
+    def add_capture(self, scope, board=None):
+        data = np.stack([scope.GetData_Bin(Channel=1, Units='RAW'),
+                         scope.GetData_Bin(Channel=2, Units='RAW')])
+
+        if board is None:
+            board = getattr(scope.rp, 'host', '')
+
+        return self.add(data, scope.GetSettings(), board=board, timestamp=scope.TriggerTime,
+                        start=scope.GetWindowStart())
+
+    # =================================================================================
+    # Memory maps, reopened when the files have grown (also by another process)
+    # =================================================================================
+    @property
+    def index(self):
+        size = os.path.getsize(self.index_name) // index_dtype.itemsize
+
+        if (self.index_map is None) or (len(self.index_map) != size):
+            if (size == 0):
+                self.index_map = np.zeros(0, dtype=index_dtype)
+            else:
+                self.index_map = np.memmap(self.index_name, dtype=index_dtype, mode='r', shape=(size,))
+
+        return self.index_map
+
+    def get_samples_map(self, stop):
+        if (self.samples_map is None) or (self.samples_map.size < stop):
+            size = os.path.getsize(self.samples_name) // 2
+            self.samples_map = np.memmap(self.samples_name, dtype='<i2', mode='r', shape=(size,))
+
+        return self.samples_map
+
+    def __len__(self):
+        return len(self.index)
+
+    # =================================================================================
+    # Queries, returns the capture numbers. Settings are compared for equality,
+    # a tuple (min, max) selects a range:
+    #   query(trigger='CH1_PE', decimation=64, gain=(10, 10))
+    #   query(timestamp=(t_start, t_stop), board='192.168.3.150')
+    # gain and probe are compared per channel, gain1/gain2 select one channel.
+    # =================================================================================
+    def query(self, **conditions):
+        index = self.index
+        mask = np.ones(len(index), dtype=bool)
+
+        for name, value in conditions.items():
+            if name in ('gain1', 'gain2', 'probe1', 'probe2'):
+                values = index[name[:-1]][:, int(name[-1]) - 1]
+            elif name in index_dtype.names:
+                values = index[name]
+            else:
+                raise KeyError('capture_archive >> unknown setting %s' % name)
+
+            if isinstance(value, str):
+                value = value.encode()
+
+            if (name in ('gain', 'probe')):
+                mask &= np.all(values == np.asarray(value), axis=1)
+            elif isinstance(value, tuple):
+                mask &= (values >= value[0]) & (values <= value[1])
+            else:
+                mask &= (values == value)
+
+        return np.flatnonzero(mask)
+
+    # Zero-copy (nr_channels, nr_samples) view of capture i in ADC counts.
+    def get(self, i):
+        record = self.index[i]
+        start = int(record['offset'])
+        stop = start + int(record['nr_channels']) * int(record['nr_samples'])
+
+        samples = self.get_samples_map(stop)
+        return samples[start:stop].reshape(int(record['nr_channels']), int(record['nr_samples']))
+
+    # Capture i in Volt (a new float32 array).
+    def get_volts(self, i):
+        record = self.index[i]
+        data = self.get(i)
+        return data * record['scale'][:data.shape[0], None]
+
+    # Sample times from the start of the full buffer, window captures included.
+    def get_time_vector(self, i):
+        record = self.index[i]
+        return (record['window_start'] + np.arange(record['nr_samples'])) / record['frequency']
+
+    def select(self, **conditions):
+        return [self.get(i) for i in self.query(**conditions)]
+
+    def __getitem__(self, i):
+        return self.get(i)
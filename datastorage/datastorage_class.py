@@ -3,10 +3,408 @@ import matplotlib.colors as mcolors
 import matplotlib.pyplot as plt
 import matplotlib
 
+import os
+import time
+import queue
+import shutil
+import threading
+import zlib
 import pickle
 import json
 
 
+# dtype of a column after appending values, as np.append: starting from the
+# float64 of an empty column, so numbers become float64. The streaming writer
+# uses the same rule, a streamed column loads with the in-memory dtype.
+def append_dtype(dtype, values):
+    return np.concatenate((np.empty(0, dtype=dtype), np.asarray(values).ravel()[:0])).dtype
+
+
+# =================================================================================
+# Growable 1D column: amortized O(1) appends by doubling the capacity.
+# The dtype is fixed on the first append with the same promotion as np.append
+# on an empty list (so numbers become float64) and only changes when data of
+# a wider type is appended.
+# =================================================================================
+class column_buffer:
+    min_capacity = 16
+
+    def __init__(self, in_data=None, dtype=np.float64):
+        self.data = np.empty(0, dtype=dtype)
+        self.size = 0
+
+        if in_data is not None:
+            self.data = np.array(in_data).ravel()
+            self.size = self.data.size
+        return
+
+    def append(self, in_data):
+        values = np.asarray(in_data).ravel()
+        needed = self.size + values.size
+        dtype = append_dtype(self.data.dtype, values)
+
+        if (needed > self.data.size) or (dtype != self.data.dtype):
+            capacity = max(needed, 2 * self.data.size, self.min_capacity)
+            new_data = np.empty(capacity, dtype=dtype)
+            new_data[:self.size] = self.data[:self.size]
+            self.data = new_data
+
+        self.data[self.size:needed] = values
+        self.size = needed
+        return
+
+    def view(self):
+        # Zero-copy view of the valid part, only valid until the next append.
+        return self.data[:self.size]
+
+    def trim(self):
+        # Release the unused capacity, returns the view of the data.
+        if (self.data.size != self.size):
+            self.data = self.data[:self.size].copy()
+        return self.data
+
+    def __len__(self):
+        return self.size
+
+
+# =================================================================================
+# On-disk format: a directory with a json file and per column a directory
+# with the chunks as raw (or zlib compressed) little endian data.
+#
+#   Testing.dat/
+#       datastorage.json    title, labels and per column: dtype, chunk
+#                           lengths, compression and attributes
+#       c0/0, c0/1, ...     chunks of the first column
+#
+# Chunks can have different lengths (a streaming writer adds one per flush).
+# A stream also stores the number of captures and per column the capture of
+# its first chunk, chunks written after the last json update are recovered
+# from the files (recover_storage_meta).
+# =================================================================================
+storage_format = 'datastorage'
+storage_version = 1
+storage_meta = 'datastorage.json'
+
+
+def is_storage_dir(filename):
+    return os.path.isfile(os.path.join(filename, storage_meta))
+
+
+def read_storage_meta(filename):
+    with open(os.path.join(filename, storage_meta), 'r') as filehandle:
+        meta = json.load(filehandle)
+
+    if meta.get('format') != storage_format:
+        raise ValueError('datastorage >> %s is not a datastorage file' % filename)
+    return meta
+
+
+def write_storage_meta(filename, meta, fsync=True):
+    # Write to a temporary file first, readers never see a half written json.
+    temp = os.path.join(filename, storage_meta + '.tmp')
+    with open(temp, 'w') as filehandle:
+        json.dump(meta, filehandle, indent=1)
+        if fsync:
+            filehandle.flush()
+            os.fsync(filehandle.fileno())
+    os.replace(temp, os.path.join(filename, storage_meta))
+    return
+
+
+def write_chunk(filename, path, index, values, compression='zlib', level=1):
+    data = np.ascontiguousarray(values).tobytes()
+    if (compression == 'zlib'):
+        data = zlib.compress(data, level)
+
+    # A chunk file that exists is complete, see recover_storage_meta.
+    chunk_file = os.path.join(filename, path, str(index))
+    with open(chunk_file + '.tmp', 'wb') as filehandle:
+        filehandle.write(data)
+    os.replace(chunk_file + '.tmp', chunk_file)
+    return chunk_file
+
+
+# Number of values in a chunk file, None when it does not exist (yet).
+def read_chunk_length(filename, column, index):
+    chunk_file = os.path.join(filename, column['path'], str(index))
+    if not os.path.isfile(chunk_file):
+        return None
+
+    itemsize = np.dtype(column['dtype']).itemsize
+    if (column.get('compression', 'none') == 'zlib'):
+        with open(chunk_file, 'rb') as filehandle:
+            return len(zlib.decompress(filehandle.read())) // itemsize
+
+    return os.path.getsize(chunk_file) // itemsize
+
+
+# =================================================================================
+# A stream writes the json only every fsync_interval. The chunks written since
+# then (a stream that is still running or was interrupted) are added here,
+# as far as all columns have them: only complete captures are recovered.
+# =================================================================================
+def recover_storage_meta(filename, meta):
+    columns = [column for column in meta['columns'].values() if column['dtype'] is not None]
+    if ('captures' not in meta) or not columns:
+        return meta
+
+    found = {}
+    for column in columns:
+        lengths = []
+        while 1:
+            length = read_chunk_length(filename, column, len(column['chunks']) + len(lengths))
+            if length is None:
+                break
+            lengths.append(length)
+        found[column['path']] = lengths
+
+    captures = min(column['first_capture'] + len(column['chunks']) + len(found[column['path']]) for column in columns)
+    captures = max(captures, meta['captures'])
+
+    for column in columns:
+        extra = captures - column['first_capture'] - len(column['chunks'])
+        column['chunks'].extend(found[column['path']][:max(extra, 0)])
+
+    meta['captures'] = captures
+    return meta
+
+
+def remove_storage(filename):
+    if os.path.isdir(filename):
+        shutil.rmtree(filename)
+    elif os.path.exists(filename):
+        os.remove(filename)
+    return
+
+
+# =================================================================================
+# Lazy handle to a stored column. Nothing is read on open, indexing with an
+# integer or a slice only reads the chunks it needs. Uncompressed chunks are
+# memory-mapped. np.asarray(column) reads the complete column.
+# =================================================================================
+class column_file:
+    cache_size = 8
+
+    def __init__(self, filename, meta):
+        self.filename = filename
+        self.path = meta['path']
+        self.dtype = np.dtype(meta['dtype'])
+        self.compression = meta.get('compression', 'none')
+        self.chunks = list(meta['chunks'])
+        self.attrs = meta.get('attrs', {})
+        self.offsets = np.concatenate(([0], np.cumsum(self.chunks, dtype=np.int64)))
+        self.size = int(self.offsets[-1])
+        self.shape = (self.size,)
+        self.cache = {}
+        return
+
+    def __len__(self):
+        return self.size
+
+    def read_chunk(self, index):
+        if index in self.cache:
+            return self.cache[index]
+
+        chunk_file = os.path.join(self.filename, self.path, str(index))
+
+        if (self.chunks[index] == 0):
+            values = np.empty(0, dtype=self.dtype)
+        elif (self.compression == 'zlib'):
+            with open(chunk_file, 'rb') as filehandle:
+                values = np.frombuffer(zlib.decompress(filehandle.read()), dtype=self.dtype)
+        else:
+            values = np.memmap(chunk_file, dtype=self.dtype, mode='r', shape=(self.chunks[index],))
+
+        if (len(self.cache) >= self.cache_size):
+            self.cache.pop(next(iter(self.cache)))
+        self.cache[index] = values
+        return values
+
+    def read(self, start, stop):
+        start = max(0, min(start, self.size))
+        stop = max(start, min(stop, self.size))
+
+        first = int(np.searchsorted(self.offsets, start, side='right')) - 1
+        last = int(np.searchsorted(self.offsets, stop, side='left'))
+
+        if (start == stop):
+            return np.empty(0, dtype=self.dtype)
+
+        # Within one chunk: a view on the chunk (memory-mapped if uncompressed)
+        if (last - first == 1):
+            offset = self.offsets[first]
+            return self.read_chunk(first)[start - offset:stop - offset]
+
+        values = np.empty(stop - start, dtype=self.dtype)
+        for i in range(first, last):
+            lo = max(start, self.offsets[i])
+            hi = min(stop, self.offsets[i + 1])
+            values[lo - start:hi - start] = self.read_chunk(i)[lo - self.offsets[i]:hi - self.offsets[i]]
+        return values
+
+    def __getitem__(self, key):
+        if isinstance(key, slice):
+            start, stop, step = key.indices(self.size)
+            if (step > 0):
+                return self.read(start, stop)[::step]
+            return np.asarray(self)[key]
+
+        if isinstance(key, (int, np.integer)):
+            index = key + self.size if (key < 0) else key
+            if not (0 <= index < self.size):
+                raise IndexError('datastorage >> index %d out of range' % key)
+            return self.read(index, index + 1)[0]
+
+        return np.asarray(self)[key]
+
+    def __array__(self, dtype=None, copy=None):
+        values = self.read(0, self.size)
+        if dtype is not None:
+            values = values.astype(dtype)
+        return values
+
+
+# =================================================================================
+# Append-only writer of the chunked format, used by datastorage_class.open_stream.
+# Captures are put in a bounded queue and written by a background thread, one
+# chunk per column per capture (an empty one for a column without data).
+# The json is only replaced every fsync_interval seconds and on close, after
+# the chunks are synced to disk; a reader (load_data) recovers the complete
+# captures written since from the chunk files. Only a new column rewrites the
+# json right away, its dtype is needed to read its chunks.
+# A full queue blocks put(): the acquisition slows down to the disk speed
+# instead of filling the memory.
+# =================================================================================
+class datastorage_writer:
+
+    def __init__(self, filename, meta, queue_size=16, fsync_interval=1.0):
+        self.filename = filename
+        self.meta = meta
+        self.fsync_interval = fsync_interval
+        self.unsynced = []
+        self.last_sync = time.monotonic()
+        self.error = None
+        self.meta['captures'] = 0
+
+        for column in meta['columns'].values():
+            column['first_capture'] = 0
+
+        remove_storage(filename)
+        os.makedirs(filename)
+        for column in meta['columns'].values():
+            os.makedirs(os.path.join(filename, column['path']))
+        write_storage_meta(filename, meta)
+
+        self.queue = queue.Queue(maxsize=queue_size)
+        self.thread = threading.Thread(target=self.run, name='datastorage_writer', daemon=True)
+        self.thread.start()
+        return
+
+    # capture: {name: values}, attrs: {name: {..}} for the json
+    def put(self, capture, attrs=None):
+        self.check()
+        self.queue.put((capture, attrs))
+        return
+
+    def close(self):
+        self.queue.put(None)
+        self.thread.join()
+        self.check()
+        return
+
+    def check(self):
+        if self.error is not None:
+            raise IOError('datastorage >> writing %s failed' % self.filename) from self.error
+        return
+
+    def run(self):
+        while 1:
+            item = self.queue.get()
+            if item is None:
+                break
+
+            # After an error the queue is still emptied, put() does not block.
+            if self.error is None:
+                try:
+                    self.write(*item)
+                except Exception as e:
+                    self.error = e
+
+        if self.error is None:
+            try:
+                self.sync()
+            except Exception as e:
+                self.error = e
+        return
+
+    def write(self, capture, attrs=None):
+        columns = self.meta['columns']
+        captures = self.meta['captures']
+        new_columns = False
+
+        for name in capture:
+            if name not in columns:
+                columns[name] = {'path': 'c%d' % len(columns), 'dtype': None, 'first_capture': captures,
+                                 'compression': self.meta['compression'], 'chunks': [], 'attrs': {}}
+                os.makedirs(os.path.join(self.filename, columns[name]['path']))
+
+        for name, column in columns.items():
+            if name in capture:
+                values = np.asarray(capture[name]).ravel()
+                dtype = append_dtype(np.float64, values)
+                values = values.astype(dtype.newbyteorder('<'), copy=False)
+            elif column['dtype'] is not None:
+                values = np.empty(0, dtype=column['dtype'])
+            else:
+                # No data yet, the column starts at a later capture
+                column['first_capture'] = captures + 1
+                continue
+
+            if column['dtype'] is None:
+                column['dtype'] = values.dtype.str
+                new_columns = True
+            elif (values.dtype.str != column['dtype']):
+                values = values.astype(column['dtype'])
+
+            capture[name] = values
+
+        # The json must know the dtype before a reader finds the chunks
+        if new_columns:
+            write_storage_meta(self.filename, self.meta, fsync=False)
+
+        for name, column in columns.items():
+            if column['dtype'] is None:
+                continue
+            chunk_file = write_chunk(self.filename, column['path'], len(column['chunks']), capture[name], column['compression'])
+            self.unsynced.append(chunk_file)
+            column['chunks'].append(int(capture[name].size))
+
+        self.meta['captures'] = captures + 1
+
+        if attrs:
+            for name, value in attrs.items():
+                if name in columns:
+                    columns[name]['attrs'] = value
+
+        if (time.monotonic() - self.last_sync >= self.fsync_interval):
+            self.sync()
+        return
+
+    # The chunks are synced before the json that refers to them.
+    def sync(self):
+        for chunk_file in self.unsynced:
+            fd = os.open(chunk_file, os.O_RDONLY)
+            try:
+                os.fsync(fd)
+            finally:
+                os.close(fd)
+
+        self.unsynced = []
+        write_storage_meta(self.filename, self.meta, fsync=True)
+        self.last_sync = time.monotonic()
+        return
+
+
 class datastorage_class:
     name_list = {}
     title = []
@@ -15,6 +413,12 @@ class datastorage_class:
 
     def __init__(self, name):
         self.name = name
+        # Per object, the class dict would be shared by all storages.
+        self.name_list = {}
+        self.attrs = {}
+        self.stream = None
+        self.stream_capture = {}
+        self.keep_in_memory = True
         return
 
     def add_title(self, in_title):
@@ -23,7 +427,7 @@ class datastorage_class:
 
     def add_name(self, in_name, debug=0):
         # self.name_list.append(in_name)
-        self.name_list[in_name] = []
+        self.name_list[in_name] = column_buffer()
         return
     
     def add_x_label(self, inLabel):
@@ -35,9 +439,20 @@ class datastorage_class:
         return
 
     def add_data(self, in_name, in_data, debug = 0):
-        old_data = self.name_list[in_name]
-        new_data = np.append(old_data, in_data)
-        self.name_list[in_name] = new_data
+        if self.stream is not None:
+            # copy, the caller may reuse its buffer before the writer is done
+            self.stream_capture.setdefault(in_name, []).append(np.array(in_data))
+            if not self.keep_in_memory:
+                return
+
+        column = self.name_list[in_name]
+
+        # Arrays stored with add_array or set_offset continue as a buffer
+        if not isinstance(column, column_buffer):
+            column = column_buffer(column)
+            self.name_list[in_name] = column
+
+        column.append(in_data)
         return
 
     def add_array(self, in_name, in_data, debug = 0):
@@ -45,14 +460,50 @@ class datastorage_class:
         return
     
     def get_data(self, in_name):
-        return self.name_list[in_name]
+        column = self.name_list[in_name]
+
+        if isinstance(column, column_buffer):
+            return column.view()
+
+        if isinstance(column, column_file):
+            return np.asarray(column)
+
+        return column
+
+    # Lazy handle of a loaded column, slicing reads only the needed chunks.
+    def get_column(self, in_name):
+        column = self.name_list[in_name]
+
+        if isinstance(column, column_buffer):
+            return column.view()
+
+        return column
+
+    # Per column metadata, for example: units='V', label='Channel 1',
+    # scope=Scope.GetSettings(). Values must be json serializable.
+    def set_attrs(self, in_name, **attrs):
+        self.attrs.setdefault(in_name, {}).update(attrs)
+        return
+
+    def get_attrs(self, in_name):
+        return self.attrs.get(in_name, {})
+
+    def view(self, in_name):
+        return self.get_data(in_name)
+
+    def trim(self):
+        # Release the unused capacity of all columns.
+        for column in self.name_list.values():
+            if isinstance(column, column_buffer):
+                column.trim()
+        return
     
     def set_offset(self, in_name, in_offset):
-        self.name_list[in_name] = self.name_list[in_name] + in_offset
+        self.name_list[in_name] = self.get_data(in_name) + in_offset
         return 
 
     def plot_data_no_x(self, ax, in_name, color=1, points_only=False, label='', title='', marker='', linewidth=1):
-        values = self.name_list[in_name]
+        values = self.get_data(in_name)
         fake_x = np.arange(0, values.size)
 
         if (points_only):
@@ -69,8 +520,8 @@ class datastorage_class:
         return
 
     def plot_data(self, ax, in_name_x, in_name_y, color=1, points_only=False, label='', title='', marker='', linewidth=1, x_offset=0):
-        values_x = self.name_list[in_name_x] + x_offset
-        values_y = self.name_list[in_name_y]
+        values_x = self.get_data(in_name_x) + x_offset
+        values_y = self.get_data(in_name_y)
 
         if (points_only):
             self.plot_points(ax, values_x, values_y, color=color, label=label, title=title, marker=marker, linewidth=linewidth)
@@ -86,8 +537,8 @@ class datastorage_class:
         return
     
     def plot_data_colors(self, ax, in_name_x, in_name_y, color="black", points_only=False, label='', title='', marker='', linewidth=1, x_offset=0):
-        values_x = self.name_list[in_name_x] + x_offset
-        values_y = self.name_list[in_name_y]
+        values_x = self.get_data(in_name_x) + x_offset
+        values_y = self.get_data(in_name_y)
 
         if (points_only):
             self.plot_points_colors(ax, values_x, values_y, color=color, label=label, title=title, marker=marker, linewidth=linewidth)
@@ -103,8 +554,8 @@ class datastorage_class:
         return
     
     def plot_data_bars_colors(self, ax, in_name_x, in_name_y, color="black", label='', title='', width=1, barcount=1, barID=1):
-        values_x = self.name_list[in_name_x]
-        values_y = self.name_list[in_name_y]
+        values_x = self.get_data(in_name_x)
+        values_y = self.get_data(in_name_y)
 
         if (barcount == 1):
             width = 0.5;
@@ -186,15 +637,133 @@ class datastorage_class:
         ax.legend()
         return    
 
-    def save_data(self, filename):
+    # =================================================================================
+    # Save in the chunked format (see column_file). The data is written next to
+    # the old file and swapped in when complete.
+    # =================================================================================
+    def save_data(self, filename, compression='zlib', chunk_size=1 << 20):
+        temp = filename + '.tmp'
+        if os.path.isdir(temp):
+            shutil.rmtree(temp)
+        os.makedirs(temp)
+
+        meta = self.get_storage_meta(compression)
+
+        for index, name in enumerate(self.name_list):
+            values = np.asarray(self.get_data(name))
+            if (values.dtype == object):
+                raise TypeError('datastorage >> column %s can not be stored' % name)
+
+            values = values.ravel().astype(values.dtype.newbyteorder('<'), copy=False)
+            column = meta['columns'][name]
+            column['path'] = 'c%d' % index
+            column['dtype'] = values.dtype.str
+            os.makedirs(os.path.join(temp, column['path']))
+
+            for i, start in enumerate(range(0, values.size, chunk_size)):
+                write_chunk(temp, column['path'], i, values[start:start + chunk_size], compression)
+                column['chunks'].append(int(min(chunk_size, values.size - start)))
+
+        write_storage_meta(temp, meta)
+
+        remove_storage(filename)
+        os.replace(temp, filename)
+        return
+
+    def get_storage_meta(self, compression='zlib'):
+        meta = {
+            'format': storage_format,
+            'version': storage_version,
+            'name': self.name,
+            'title': self.title,
+            'xlabel': self.xlabel,
+            'ylabel': self.ylabel,
+            'columns': {},
+        }
+
+        for name in self.name_list:
+            meta['columns'][name] = {'path': None, 'dtype': None, 'compression': compression,
+                                     'chunks': [], 'attrs': self.get_attrs(name)}
+        return meta
+
+    # =================================================================================
+    # Streaming: open the file before the measurement, the data of add_data is
+    # written per capture (end_capture) by a background thread.
+    #
+    # Data.open_stream("Testing.dat")
+    # for i in range(N):
+    #     Data.add_data("Channel 1", ...)
+    #     Data.end_capture()
+    # Data.close_stream()
+    #
+    # With keep_in_memory=False the data is not kept, after close_stream the
+    # columns are read lazily from the file.
+    # =================================================================================
+    def open_stream(self, filename, compression='zlib', queue_size=16, fsync_interval=1.0, keep_in_memory=False):
+        meta = self.get_storage_meta(compression)
+        meta['compression'] = compression
+
+        for index, name in enumerate(meta['columns']):
+            meta['columns'][name]['path'] = 'c%d' % index
+
+        self.stream = datastorage_writer(filename, meta, queue_size, fsync_interval)
+        self.stream_filename = filename
+        self.stream_capture = {}
+        self.keep_in_memory = keep_in_memory
+        return
+
+    def end_capture(self):
+        if (self.stream is None) or (not self.stream_capture):
+            return
+
+        capture = {k: np.concatenate([np.ravel(x) for x in v]) for k, v in self.stream_capture.items()}
+        attrs = {k: dict(v) for k, v in self.attrs.items()}
+        self.stream_capture = {}
+
+        self.stream.put(capture, attrs)
+        return
+
+    def close_stream(self):
+        if self.stream is None:
+            return
+
+        self.end_capture()
+        stream = self.stream
+        self.stream = None
+        stream.close()
+
+        if not self.keep_in_memory:
+            self.load_data(self.stream_filename)
+
+        self.keep_in_memory = True
+        return
+
+    # Old format: the pickled columns and title.
+    def save_data_legacy(self, filename):
         with open(filename, 'wb') as filehandle:
             # store the data as binary data stream
-            pickle.dump(self.name_list, filehandle)
+            pickle.dump({k: self.get_data(k) for k in self.name_list}, filehandle)
             pickle.dump(self.title, filehandle)
 
         return
 
+    # =================================================================================
+    # Chunked files are opened lazily: the columns are column_file handles and
+    # nothing is read until the data is used. Old pickle files are still read.
+    # =================================================================================
     def load_data(self, filename):
+        if is_storage_dir(filename):
+            meta = recover_storage_meta(filename, read_storage_meta(filename))
+
+            for k, v in meta['columns'].items():
+                self.name_list[k] = column_file(filename, v)
+                self.attrs[k] = v.get('attrs', {})
+
+            self.title = meta.get('title', [])
+            self.xlabel = meta.get('xlabel', [])
+            self.ylabel = meta.get('ylabel', [])
+            return
+
         with open(filename, 'rb') as filehandle:
             # store the data as binary data stream
             tmp_dict = pickle.load(filehandle)
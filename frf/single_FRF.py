@@ -103,7 +103,7 @@ def main():
         Scope.SetTrigger(Trigger = "DISABLED")
         Scope.Start()   
 
-        time.sleep(1)
+        Scope.WaitForPreTrigger(Delay = 8192)
 
         Scope.SetTrigger(Trigger = "CH1_PE", Level = 0.5, Delay = 8192)
         Scope.PrintSettings()
@@ -119,13 +119,9 @@ def main():
         else:
             SetPlotYAxis(ax1, 2)
 
-        # Timing with the scpi interface is not very good.
-        # Add sleep(some number) if data seems not oke.
-        # Make sure to wait long enoug for the measurement to finish.
-        time.sleep(1)
+        # WaitForTrigger() returns when the buffer after the trigger is full.
 
-        Data1 = Scope.GetGain(1) * Scope.GetData_Txt(Channel = 1)
-        Data2 = Scope.GetGain(2) * Scope.GetData_Txt(Channel = 2)
+        Data1, Data2 = Scope.GetDataBoth()
         
         # Pitaya.tx_txt('ACQ:STOP');
 
@@ -0,0 +1,57 @@
+#==============================================================================
+# Scope script that stores every capture in a capture archive (raw ADC
+# counts plus the scope settings) and afterwards plots a query on it.
+#
+# M. Hajer, 2021
+#==============================================================================
+
+import sys
+sys.path.append('../classes')
+sys.path.append('../datastorage')
+
+import redpitaya_scpi as scpi
+import numpy as np
+from redpitaya_class import redpitaya_scope as redpitaya_scope
+from capture_archive import capture_archive as capture_archive
+
+import matplotlib.pyplot as plt
+
+#==============================================================================
+# Main
+#==============================================================================
+def main():
+    ip = "192.168.3.150"
+
+    Pitaya  = scpi.scpi(ip)
+    Scope   = redpitaya_scope(Pitaya)
+    Archive = capture_archive('archive')
+
+    for Decimation in [6, 9]:
+        Scope.SetDecimationBeta(Decimation)
+        Scope.SetInputGain(Channel = 1, Gain = 'LV')
+        Scope.SetInputGain(Channel = 2, Gain = 'LV')
+        Scope.SetTrigger(Trigger = "NOW", Delay = 8192)
+
+        for i in range(10):
+            Scope.Start()
+            Scope.WaitForTrigger(Timeout = 5)
+            Archive.add_capture(Scope)
+
+    Pitaya.close()
+
+    # Only the index is read, the captures are views on the archive file.
+    Captures = Archive.query(decimation = 64, trigger = 'NOW', gain = (1, 1))
+    print("Captures in archive : %d, selected : %d" % (len(Archive), len(Captures)))
+
+    fig, axes = plt.subplots(1, 1)
+    for i in Captures:
+        x = Archive.get_time_vector(i)
+        axes.plot(x * 1000, Archive.get_volts(i)[0], 'g-', linewidth = 0.5)
+
+    axes.grid(True)
+    axes.set(xlabel = 'Time [msec]', ylabel = 'Volt [Volt]', title = 'Channel 1, decimation 64')
+    plt.show()
+
+
+if __name__== "__main__":
+    main()
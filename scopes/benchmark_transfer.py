@@ -0,0 +1,68 @@
+#==============================================================================
+# Capture benchmark against the local Red Pitaya simulator.
+# Measures the time per capture (arm, trigger, download of both channels)
+# for the ASCII and binary transfer, with optional network emulation.
+#
+# python benchmark_transfer.py --latency 0.001 --bandwidth 10e6
+#
+# M. Hajer, 2021
+#==============================================================================
+
+import sys
+sys.path.append('../classes')
+
+import argparse
+import time
+import numpy as np
+import redpitaya_scpi as scpi
+from redpitaya_class import redpitaya_scope as redpitaya_scope
+from redpitaya_simulator import redpitaya_simulator as redpitaya_simulator
+
+def capture(Scope, GetData):
+    Scope.Start()
+    Scope.WaitForTrigger()
+    Data1 = Scope.GetGain(1) * GetData(Channel = 1)
+    Data2 = Scope.GetGain(2) * GetData(Channel = 2)
+    return Data1, Data2
+
+def capture_both(Scope):
+    Scope.Start()
+    Scope.WaitForTrigger()
+    return Scope.GetDataBoth()
+
+def benchmark(Scope, GetData, N):
+    # First capture is not timed (format switch, warm up)
+    Capture = capture_both if GetData is None else lambda Scope: capture(Scope, GetData)
+    Capture(Scope)
+
+    start = time.perf_counter()
+    for i in range(N):
+        Capture(Scope)
+    return (time.perf_counter() - start) / N
+
+def main():
+    parser = argparse.ArgumentParser(description='Red Pitaya capture benchmark')
+    parser.add_argument('--runs',      type=int,   default=20)
+    parser.add_argument('--latency',   type=float, default=0.0,  help='Delay per reply [sec]')
+    parser.add_argument('--bandwidth', type=float, default=None, help='Reply bandwidth [bytes/sec]')
+    args = parser.parse_args()
+
+    Sim = redpitaya_simulator(Port = 0, Latency = args.latency, Bandwidth = args.bandwidth)
+    Sim.Start()
+
+    Pitaya = scpi.scpi('127.0.0.1', port = Sim.Port)
+
+    Scope = redpitaya_scope(Pitaya)
+    Scope.SetDecimationBeta(0)
+    Scope.SetTrigger(Trigger = "NOW", Delay = 8192)
+
+    print("ASCII capture   : %.3f msec" % (1000 * benchmark(Scope, Scope.GetData_Txt, args.runs)))
+    print("BIN capture     : %.3f msec" % (1000 * benchmark(Scope, Scope.GetData_Bin, args.runs)))
+    print("BIN both        : %.3f msec" % (1000 * benchmark(Scope, None, args.runs)))
+
+    Pitaya.close()
+    Sim.Stop()
+
+
+if __name__== "__main__":
+    main()
@@ -0,0 +1,63 @@
+#==============================================================================
+# Scope script for a rack of Red Pitaya boards.
+# All boards are armed, waited on and downloaded concurrently with asyncio,
+# so the total time is that of the slowest board instead of the sum.
+#
+# M. Hajer, 2021
+#==============================================================================
+
+import sys
+sys.path.append('../classes')
+
+import asyncio
+import time
+import numpy as np
+import matplotlib.pyplot as plt
+from redpitaya_scpi_async import AsyncScpi
+from redpitaya_class_async import redpitaya_scope_async as redpitaya_scope_async
+
+#==============================================================================
+# One capture of both channels on one board.
+#==============================================================================
+async def capture(ip):
+    async with AsyncScpi(ip, timeout = 10) as Pitaya:
+        Scope = redpitaya_scope_async(Pitaya)
+        Scope.SetDecimationBeta(8)
+        Scope.SetInputGain(Channel = 1, Gain = 'LV')
+        Scope.SetInputGain(Channel = 2, Gain = 'LV')
+        Scope.SetAverage(0)
+        Scope.SetTrigger(Trigger = "NOW", Delay = 8192)
+
+        Scope.Start()
+        await Scope.WaitForTrigger()
+
+        Data1, Data2 = await Scope.GetDataBoth()
+
+        return Scope.GetTimeVector(), Data1, Data2
+
+
+#==============================================================================
+# Main
+#==============================================================================
+async def main():
+    ips = ["192.168.3.150", "192.168.3.151", "192.168.3.152"]
+
+    start = time.perf_counter()
+    results = await asyncio.gather(*[capture(ip) for ip in ips])
+    print("Captured %d boards in %.3f sec" % (len(ips), time.perf_counter() - start))
+
+    fig, axes = plt.subplots(len(ips), 1, sharex=True, squeeze=False)
+
+    for ax, ip, (x, Data1, Data2) in zip(axes[:, 0], ips, results):
+        ax.plot(x * 1000, Data1, 'g-', label="Channel 1")
+        ax.plot(x * 1000, Data2, 'b-', label="Channel 2")
+        ax.set(ylabel='Volt [Volt]', title=ip)
+        ax.grid(True)
+        ax.legend()
+
+    axes[-1, 0].set(xlabel='Time [msec]')
+    plt.show()
+
+
+if __name__== "__main__":
+    asyncio.run(main())
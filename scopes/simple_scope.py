@@ -15,6 +15,7 @@ import redpitaya_scpi as scpi
 import matplotlib.pyplot as plt
 import numpy as np
 from redpitaya_class import redpitaya_scope as redpitaya_scope
+from redpitaya_liveview import redpitaya_liveview as redpitaya_liveview
 import addcopyfighandler
 import mplcursors
 
@@ -83,21 +84,16 @@ def SetPlotYAxis(axis, YRange):
 #==============================================================================
 # Axctual plotting function. 
 # Called when data is available
+# Only the lines are drawn again (blitting), the axes are part of the saved
+# background. At most MaxFrameRate updates per second.
 #==============================================================================
-def UpdatePlot(Scope, fig, line1, line2, triggerline, Data1, Data2):
-    line1.set_ydata(Data1)
-    line2.set_ydata(Data2)
-    
-    
-    x_trig = Scope.GetTriggerVector() * 1000
-    y_trig = np.array([-1.0 , 1.0]) * 20.0
+def UpdatePlot(Scope, LiveView, Data1, Data2):
+    x = Scope.GetTimeVector() * 1000
 
-    triggerline.set_xdata(x_trig)
-    triggerline.set_ydata(y_trig)
+    x_trig = Scope.GetTriggerVector().ravel() * 1000
+    y_trig = np.array([-1.0 , 1.0]) * 20.0
 
-    fig.canvas.draw()
-    fig.canvas.flush_events()
-            
+    LiveView.Update([Data1, Data2, y_trig], X = [x, x, x_trig])
     return
 
 
@@ -121,16 +117,17 @@ def main():
     Scope.SetTrigger(Trigger = "NOW")
 
     [fig, plt, line1, line2, triggerline, ax1] = PreparePlot(Scope)
+    LiveView = redpitaya_liveview(fig, ax1, [line1, line2, triggerline], MaxFrameRate = 25)
        
     try:
         while True:
             Scope.SetTrigger(Trigger = "DISABLED")
             Scope.Start()   
     
-            # Sleep is only needed when trigger delay = 0 (middle of the data) 
+            # Waiting is only needed when trigger delay = 0 (middle of the data) 
             # In that case we want to make sure the pre-trigger buffer is full
             # before setting the actual trigger.
-            # time.sleep(1)
+            Scope.WaitForPreTrigger(Delay = 0)
     
             Scope.SetTrigger(Trigger = "CH2_PE", Level = 0.0, Delay = 0)
             # Scope.SetTrigger(Trigger = "NOW")
@@ -138,29 +135,20 @@ def main():
 
             Scope.WaitForTrigger()
     
-            # Timing with the scpi interface is not very good.
-            # Quite some timing overhead seems to be present.
-            
-            # WaitForTrigger() returns immediately after the trigger event
-            # and does not wait for the buffer to fill to the end.
-            # Add sleep(some number) if data seems not oke.
-            # sleep time can be calculated based on the sample frequency and the
-            # number of samples after the trigger event.
-            
-            time.sleep(1)
+            # WaitForTrigger() returns when the buffer after the trigger is full.
     
-            Data1 = Scope.GetGain(1) * Scope.GetData_Txt(Channel = 1)
-            Data2 = Scope.GetGain(2) * Scope.GetData_Txt(Channel = 2)
+            Data1, Data2 = Scope.GetDataBoth()
             
             # Pitaya.tx_txt('ACQ:STOP');
     
             print("Trigger delay   : %.6f Sec"  % ((8192-0)/Scope.Frequency))
-            UpdatePlot(Scope, fig, line1, line2, triggerline, Data1, Data2)    
+            UpdatePlot(Scope, LiveView, Data1, Data2)    
    
     except KeyboardInterrupt:
         print('interrupted!')
         
     Pitaya.close()
+    LiveView.Stop()
     mplcursors.cursor([ax1], multiple=True)
     plt.show()
 
@@ -15,6 +15,8 @@ import redpitaya_scpi as scpi
 import matplotlib.pyplot as plt
 import numpy as np
 from redpitaya_class import redpitaya_scope as redpitaya_scope
+from redpitaya_liveview import redpitaya_liveview as redpitaya_liveview
+from redpitaya_acquisition import redpitaya_acquisition as redpitaya_acquisition
 import addcopyfighandler
 import mplcursors
 
@@ -34,8 +36,8 @@ def PreparePlot(Scope):
     x_trig = Scope.GetTriggerVector() * 1000
     y_trig = Scope.GetTriggerData()
    
-    y1 = np.zeros((16384, 1))
-    y2 = np.zeros((16384, 1))
+    y1 = np.zeros((len(x), 1))
+    y2 = np.zeros((len(x), 1))
 
     label_ch1 = ("Channel 1 (Probe %0.fx)" % + Scope.GetProbeGain(1))
     label_ch2 = ("Channel 2 (Probe %0.fx)" % + Scope.GetProbeGain(2))
@@ -83,24 +85,50 @@ def SetPlotYAxis(axis, YRange):
 #==============================================================================
 # Axctual plotting function. 
 # Called when data is available
+# Only the lines are drawn again (blitting), the axes are part of the saved
+# background. At most MaxFrameRate updates per second.
+# x and x_trig come with the capture, the Scope belongs to the acquisition
+# thread while it runs.
 #==============================================================================
-def UpdatePlot(Scope, fig, line1, line2, triggerline, Data1, Data2):
-    line1.set_ydata(Data1)
-    line2.set_ydata(Data2)
-    
-    
-    x_trig = Scope.GetTriggerVector() * 1000
+def UpdatePlot(LiveView, Data1, Data2, x, x_trig):
     y_trig = np.array([-1.0 , 1.0]) * 20.0
 
-    triggerline.set_xdata(x_trig)
-    triggerline.set_ydata(y_trig)
-
-    fig.canvas.draw()
-    fig.canvas.flush_events()
-            
+    LiveView.Update([Data1, Data2, y_trig], X = [x, x, x_trig])
     return
 
 
+#==============================================================================
+# One capture, runs in the acquisition thread.
+#==============================================================================
+def Capture(Scope):
+    Scope.SetTrigger(Trigger = "DISABLED")
+    Scope.Start()   
+
+    # Waiting is only needed when trigger delay = 0 (middle of the data) 
+    # In that case we want to make sure the pre-trigger buffer is full
+    # before setting the actual trigger.
+    Scope.WaitForPreTrigger(Delay = 0)
+
+    Scope.SetTrigger(Trigger = "CH1_PE", Level = 0.1, Delay = 0)
+    # Scope.SetTrigger(Trigger = "NOW")
+
+    # A TriggerTimeout is retried by the acquisition thread, so it can stop
+    # when there is no trigger.
+    Scope.WaitForTrigger(Timeout = 1.0)
+
+    # WaitForTrigger() returns when the buffer after the trigger is full.
+
+    Data1, Data2 = Scope.GetDataBoth()
+
+    # Time axis of this capture, with the trigger settings it was made with
+    x      = Scope.GetTimeVector() * 1000
+    x_trig = Scope.GetTriggerVector().ravel() * 1000
+    
+    # Pitaya.tx_txt('ACQ:STOP');
+    
+    return Data1, Data2, x, x_trig
+
+
 #==============================================================================
 # Main
 #==============================================================================
@@ -118,49 +146,42 @@ def main():
     Scope.SetProbeGain(Probe = 1, Gain = 1)
     Scope.SetProbeGain(Probe = 2, Gain = 1)
     Scope.SetAverage(0)
-    Scope.SetTrigger(Trigger = "NOW")
+    Scope.SetTrigger(Trigger = "NOW", Delay = 0)
+
+    # Only 2048 samples around the trigger are transferred
+    Scope.SetWindow(Mode = 'TRIGGER', Length = 2048)
 
     [fig, plt, line1, line2, triggerline, ax1] = PreparePlot(Scope)
+    LiveView = redpitaya_liveview(fig, ax1, [line1, line2, triggerline], MaxFrameRate = 25)
+       
+    Scope.PrintSettings()
+    print("Trigger delay   : %.6f Sec"  % ((8192-0)/Scope.Frequency))
+
+    # Captures are made in a separate thread, the plot only shows the latest
+    # capture. When plotting is slower, older captures are dropped.
+    Acquisition = redpitaya_acquisition(lambda: Capture(Scope), QueueSize = 4)
+    Acquisition.Start()
        
     try:
         while True:
-            Scope.SetTrigger(Trigger = "DISABLED")
-            Scope.Start()   
-    
-            # Sleep is only needed when trigger delay = 0 (middle of the data) 
-            # In that case we want to make sure the pre-trigger buffer is full
-            # before setting the actual trigger.
-            # time.sleep(1)
-    
-            Scope.SetTrigger(Trigger = "CH1_PE", Level = 0.1, Delay = 0)
-            # Scope.SetTrigger(Trigger = "NOW")
-            Scope.PrintSettings()
+            Item = Acquisition.GetLatest(Timeout = 0.05)
 
-            Scope.WaitForTrigger()
-    
-            # Timing with the scpi interface is not very good.
-            # Quite some timing overhead seems to be present.
-            
-            # WaitForTrigger() returns immediately after the trigger event
-            # and does not wait for the buffer to fill to the end.
-            # Add sleep(some number) if data seems not oke.
-            # sleep time can be calculated based on the sample frequency and the
-            # number of samples after the trigger event.
-            
-            time.sleep(1)
-    
-            Data1 = Scope.GetGain(1) * Scope.GetData_Txt(Channel = 1)
-            Data2 = Scope.GetGain(2) * Scope.GetData_Txt(Channel = 2)
-            
-            # Pitaya.tx_txt('ACQ:STOP');
-    
-            print("Trigger delay   : %.6f Sec"  % ((8192-0)/Scope.Frequency))
-            UpdatePlot(Scope, fig, line1, line2, triggerline, Data1, Data2)    
+            if Item is None:
+                # Keep the window responsive while waiting for a trigger
+                fig.canvas.flush_events()
+                continue
+
+            Sequence, Timestamp, [Data1, Data2, x, x_trig] = Item
+            UpdatePlot(LiveView, Data1, Data2, x, x_trig)
    
     except KeyboardInterrupt:
         print('interrupted!')
         
+    Acquisition.Stop()
+    print("Captures        : %d (%d not shown)" % (Acquisition.Sequence, Acquisition.NrDropped))
+
     Pitaya.close()
+    LiveView.Stop()
     mplcursors.cursor([ax1], multiple=True)
     plt.show()
 
@@ -56,10 +56,10 @@ def do_measurement(Scope, Data):
     Scope.SetTrigger(Trigger = "DISABLED")
     Scope.Start()   
     
-    # Sleep is only needed when trigger delay = 0 (middle of the data) 
+    # Waiting is only needed when trigger delay = 0 (middle of the data) 
     # In that case we want to make sure the pre-trigger buffer is full
     # before setting the actual trigger.
-    time.sleep(1)
+    Scope.WaitForPreTrigger(Delay = 8192)
     
     # Scope.SetTrigger(Trigger = "CH1_PE", Level = 0.1, Delay = 0)
     Scope.SetTrigger(Trigger = "NOW")
@@ -67,23 +67,15 @@ def do_measurement(Scope, Data):
     
     Scope.WaitForTrigger()
     
-    # Timing with the scpi interface is not very good.
-    # Quite some timing overhead seems to be present.
-    
-    # WaitForTrigger() returns immediately after the trigger event
-    # and does not wait for the buffer to fill to the end.
-    # Add sleep(some number) if data seems not oke.
-    # sleep time can be calculated based on the sample frequency and the
-    # number of samples after the trigger event.
-    
-    time.sleep(1)
+    # WaitForTrigger() returns when the buffer after the trigger is full.
     
     # Data1 = Scope.GetGain(1) * Scope.GetData_Txt(Channel = 1)
     # Data2 = Scope.GetGain(2) * Scope.GetData_Txt(Channel = 2)
     
     Data.add_data("Time", Scope.GetTimeVector() * 1000)
-    Data.add_data("Channel 1",  Scope.GetGain(1) * Scope.GetData_Txt(Channel = 1))
-    Data.add_data("Channel 2",  Scope.GetGain(1) * Scope.GetData_Txt(Channel = 2))
+    Data1, Data2 = Scope.GetDataBoth()
+    Data.add_data("Channel 1",  Data1)
+    Data.add_data("Channel 2",  Data2)
 
     Data.add_data("TriggerTime", Scope.GetTriggerVector() * 1000)
     Data.add_data("TriggerData", Scope.GetTriggerData())
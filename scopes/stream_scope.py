@@ -0,0 +1,63 @@
+#==============================================================================
+# Continuous acquisition: both channels are streamed to a datastorage file
+# and the FRF (IN2 = plant input, IN1 = plant output) is estimated while
+# streaming. Only one block is in memory at any time.
+#
+# M. Hajer, 2021
+#==============================================================================
+
+import sys
+sys.path.append('../classes')
+sys.path.append('../datastorage')
+
+import redpitaya_scpi as scpi
+import numpy as np
+from redpitaya_class import redpitaya_scope as redpitaya_scope
+from redpitaya_stream import redpitaya_stream as redpitaya_stream
+from frf_class import frf_accumulator as frf_accumulator
+import datastorage_class as ds
+
+#==============================================================================
+# Main
+#==============================================================================
+def main():
+    ip = "192.168.3.150"
+
+    Pitaya = scpi.scpi(ip)
+
+    # Decimation 8192: 15.26 kS/s, the buffer holds 1.07 sec
+    Scope = redpitaya_scope(Pitaya)
+    Scope.SetDecimationBeta(13)
+    Scope.SetInputGain(Channel = 1, Gain = 'LV')
+    Scope.SetInputGain(Channel = 2, Gain = 'LV')
+
+    Data = ds.datastorage_class('stream')
+    Data.add_title("Red Pitaya Stream")
+    Data.add_name("Index")
+    Data.add_name("Channel 1")
+    Data.add_name("Channel 2")
+    Data.open_stream("Stream.dat")
+
+    Accumulator = frf_accumulator(SampleFrequency = Scope.Frequency, SegmentLength = 4096)
+    Stream      = redpitaya_stream(Scope)
+
+    for Block in Stream.Blocks(BlockSize = 16384, Duration = 60.0):
+        if Block.Dropped:
+            print("Block %d: samples lost before this block" % Block.Sequence)
+
+        Data.add_data("Index", [Block.Index])
+        Data.add_data("Channel 1", Block.Data[0])
+        Data.add_data("Channel 2", Block.Data[1])
+        Data.end_capture()
+
+        Accumulator.Add(Input = Block.Data[1], Output = Block.Data[0])
+
+    Data.close_stream()
+    Pitaya.close()
+
+    print("Samples lost    : %d (%d times)" % (Stream.NrLost, Stream.NrDrops))
+    print("FRF averages    : %d, mean coherence %.3f" % (Accumulator.Result.NrAverages, Accumulator.GetMeanCoherence()))
+
+
+if __name__== "__main__":
+    main()